@@ -0,0 +1,78 @@
+
+"""
+Throughput of one request per line versus several lines per request,
+against the local mock server (which charges a fixed per-request latency,
+like the network round trip and queueing of a real API).
+
+    python benchmarks/bench_batching.py [--lines 200] [--workers 4] [--batch 20]
+        [--latency fixed:0.2] [--malformed-rate 0.1]
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_openai_server import MockOpenAIServer
+from src.openai_client import OpenAIClient
+from src.prompt_builder import PromptBuilder
+
+def make_lines(count):
+    words = ["halo", "bro", "gimana", "kabar", "lu", "hari", "ini", "gue", "mau", "ke", "bank", "dulu"]
+    return [" ".join(words[(i + j) % len(words)] for j in range(3 + i % 6)) + f" {i}" for i in range(count)]
+
+def run(server, lines, workers, batch, batch_format):
+    config = {"openai": {
+        "api_key": "mock", "model": "mock", "base_url": server.base_url,
+        "warmup": False, "keepalive_interval": 0, "max_connections": workers,
+        "batch_format": batch_format, "batch_max_lines": batch
+    }}
+    client = OpenAIClient(config)
+    with open(os.path.join(ROOT, "prompt.txt"), 'r', encoding='utf-8') as f:
+        prompt = PromptBuilder(f.read()).variant("strict", "DIALOGUE")
+    route = client.router.select("", "", "")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if batch <= 1:
+            results = list(executor.map(lambda text: client.translate_text(text, prompt, route=route), lines))
+            failed = sum(1 for text, result in zip(lines, results) if result == text)
+        else:
+            groups = [lines[i:i + batch] for i in range(0, len(lines), batch)]
+            results = []
+            for group_result in executor.map(lambda group: client.translate_batch(group, prompt, route=route), groups):
+                results.extend(group_result or [None] * batch)
+            failed = sum(1 for result in results if result is None)
+    elapsed = time.perf_counter() - started
+    client.stop()
+    return elapsed, failed, route.stats["prompt_tokens"]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--latency", default="fixed:0.2")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    print(f"{args.lines} lines, {args.workers} workers, mock latency {args.latency}, "
+          f"malformed batch replies {args.malformed_rate:.0%}")
+    print(f"{'mode':<18}{'seconds':>9}{'lines/s':>9}{'requests':>10}{'prompt tok':>12}{'failed':>8}")
+    modes = [("per-line", 1, "numbered"),
+             (f"numbered x{args.batch}", args.batch, "numbered"),
+             (f"json x{args.batch}", args.batch, "json")]
+    for name, batch, batch_format in modes:
+        with MockOpenAIServer(latency=args.latency, malformed_rate=args.malformed_rate, seed=1) as server:
+            elapsed, failed, prompt_tokens = run(server, lines, args.workers, batch, batch_format)
+            print(
+                f"{name:<18}{elapsed:>9.2f}{len(lines) / elapsed:>9.1f}"
+                f"{server.stats['completions']:>10}{prompt_tokens:>12}{failed:>8}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares clipboard backends on a get/set round trip.
+Runs headless: the subprocess backend forks a fake `xclip` that keeps the
+clipboard in a temp file, and the helper backend talks to
+fake_clipboard_helper.py. The Tk backend is included when $DISPLAY is set.
+
+    python benchmarks/bench_clipboard.py [iterations]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clipboard_backends import SubprocessBackend, HelperBackend, TkBackend
+
+# A shell script, so the fork/exec cost is close to the real C tool's
+FAKE_XCLIP = """#!/bin/sh
+for arg in "$@"; do
+    if [ "$arg" = "-o" ]; then
+        cat "{path}" 2>/dev/null
+        exit 0
+    fi
+done
+cat > "{path}"
+"""
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(backend, iterations):
+    samples = []
+    for i in range(iterations):
+        text = f"/me benchmark line {i}"
+        started = time.perf_counter()
+        backend.write(text)
+        result = backend.read()
+        samples.append(time.perf_counter() - started)
+        if result != text:
+            raise RuntimeError(f"{backend.name}: read back {result!r}, expected {text!r}")
+    return samples
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xclip = os.path.join(tmp, "xclip")
+        with open(xclip, "w") as f:
+            f.write(FAKE_XCLIP.format(path=os.path.join(tmp, "clip")))
+        os.chmod(xclip, 0o755)
+
+        backends = [
+            SubprocessBackend(False, xclip=xclip),
+            HelperBackend([sys.executable, os.path.join(here, "fake_clipboard_helper.py")]),
+        ]
+        if os.environ.get("DISPLAY"):
+            try:
+                backends.append(TkBackend())
+            except Exception as e:
+                print(f"Skipping tk: {e}")
+
+        print(f"{'backend':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+        for backend in backends:
+            try:
+                samples = run(backend, iterations)
+            finally:
+                backend.close()
+            print(
+                f"{backend.name:<12}"
+                f"{percentile(samples, 50) * 1000:>10.2f}"
+                f"{percentile(samples, 95) * 1000:>10.2f}"
+                f"{percentile(samples, 99) * 1000:>10.2f}"
+                f"{iterations / sum(samples):>10.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
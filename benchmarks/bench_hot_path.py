@@ -0,0 +1,317 @@
+
+"""
+End-to-end hot path benchmark: hotkey press -> copy -> cache/API -> paste,
+run headless against local stand-ins (see fakes.py and mock_openai_server.py)
+with a fresh SQLite cache per workload.
+
+Workloads (RP chat, seeded so runs are reproducible):
+    repeat  a small set of lines pressed over and over (mostly cache hits)
+    rp-mix  /me, /do, /low and plain dialogue, some lines repeated
+    burst   rp-mix presses arriving in bursts through the input listener and
+            hotkey scheduler (debouncing, merging and dropping included)
+    prefetch  fresh lines copied by the user and prefetched (as the prefetch
+            watcher does) before the press; fails unless every press is
+            served by its prefetch
+
+    python benchmarks/bench_hot_path.py [--workloads repeat,rp-mix,burst,prefetch]
+        [--presses 100] [--latency lognormal:0.35:0.4] [--output-mode paste]
+        [--save-baseline [PATH]] [--compare [PATH]] [--tolerance 0.2] [--stages]
+
+--save-baseline writes the results as JSON; --compare checks a run against
+one and exits non-zero when p95 latency or throughput regressed by more
+than --tolerance.
+"""
+import io
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_openai_server import MockOpenAIServer
+from benchmarks.fakes import FakeDesktop, RecordingUInput, SyntheticKeyboard, use_memory_clipboard
+from src.config_loader import DEFAULT_CONFIG
+from src.cache_layer import CacheLayer
+from src.clipboard_handler import ClipboardHandler
+from src.openai_client import OpenAIClient
+from src.translator_core import TranslatorCore
+from src.hotkey_scheduler import HotkeyScheduler
+from src.input_listener import InputListener
+from src.key_typer import KeyTyper
+from src.metrics import metrics, percentile, format_table, QUANTILES
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "hot_path.json")
+
+DIALOGUE = ["halo bro", "gimana kabar lu hari ini", "gue mau ke bank dulu ya", "tunggu sebentar",
+            "makasih banyak bro", "lu udah makan belum", "ayo ikut gue", "jangan lupa bayar utang",
+            "mobil gue mogok di jalan", "siapa yang nembak tadi"]
+ACTIONS = ["mengambil dompet dari saku", "berjalan ke arah pintu", "menyalakan mesin mobil",
+           "mengangguk pelan", "menyerahkan kunci", "membuka bagasi"]
+DESCRIPTIONS = ["terlihat luka di tangan kirinya", "pintu terkunci rapat", "ada bau bensin di sekitar",
+                "hujan turun dengan deras", "mesin mobil masih panas"]
+
+def rp_line(rng):
+    roll = rng.random()
+    if roll < 0.3:
+        return f"/me {rng.choice(ACTIONS)}"
+    if roll < 0.5:
+        return f"/do {rng.choice(DESCRIPTIONS)}"
+    if roll < 0.6:
+        return f"/low {rng.choice(DIALOGUE)}"
+    return rng.choice(DIALOGUE)
+
+def make_workload(name, presses, rng):
+    """[(seconds to wait before the press, selected line)]"""
+    if name == "repeat":
+        pool = [rp_line(rng) for _ in range(25)]
+        # Zipf-like: a few lines (greetings, /me habits) dominate
+        weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+        return [(0.0, line) for line in rng.choices(pool, weights, k=presses)]
+
+    seen = []
+    lines = []
+    for i in range(presses):
+        if seen and rng.random() < 0.4:
+            line = rng.choice(seen)
+        else:
+            # Fresh line: a stock phrase plus a detail, so it misses the cache
+            line = f"{rp_line(rng)} {rng.choice(['sekarang', 'lagi', 'dulu', 'nanti'])} {i}"
+            seen.append(line)
+        lines.append(line)
+
+    if name == "rp-mix":
+        return [(0.0, line) for line in lines]
+    if name == "prefetch":
+        return [(0.0, f"{rp_line(rng)} {i}") for i in range(presses)]
+    if name == "burst":
+        # 1-4 presses a few tens of ms apart, then a pause
+        workload = []
+        i = 0
+        while i < len(lines):
+            size = rng.randint(1, 4)
+            for j, line in enumerate(lines[i:i + size]):
+                workload.append((rng.uniform(0.3, 0.8) if j == 0 else rng.uniform(0.02, 0.12), line))
+            i += size
+        return workload
+    raise ValueError(f"unknown workload: {name}")
+
+def build(config, server, desktop, output_mode, db_path):
+    config["openai"].update(api_key="mock", base_url=server.base_url, max_connections=4)
+    config["output"]["mode"] = output_mode
+    config["cache"]["db_path"] = db_path
+
+    cache = CacheLayer(db_path=config["cache"]["db_path"], options=config["cache"])
+    clipboard = use_memory_clipboard(ClipboardHandler(config), desktop)
+    openai = OpenAIClient(config)
+    openai.start()
+    core = TranslatorCore(config, cache, clipboard, openai)
+    # The real UInput needs /dev/uinput; the recording one drives the fake window instead
+    core.uinput = RecordingUInput(desktop)
+    core.typer = KeyTyper(core.uinput, float(config["output"].get("type_delay", 0.002)))
+    return cache, clipboard, openai, core
+
+def run_direct(core, desktop, workload):
+    """Presses one after another, each waiting for the previous paste."""
+    samples = []
+    for _, line in workload:
+        desktop.select(line)
+        core.process_selection()
+        pressed = desktop.take_press_time()
+        if pressed is not None:
+            samples.append(time.perf_counter() - pressed)
+    return samples, {}
+
+def run_prefetched(core, desktop, workload):
+    """The user copies each line, it is prefetched, then the hotkey is pressed on it."""
+    samples = []
+    for _, line in workload:
+        desktop.select(line)
+        desktop._set_clipboard(line)
+        core.prefetch(line)
+        # Latency is measured from the press, not from the copy
+        desktop.select(line)
+        core.process_selection()
+        pressed = desktop.take_press_time()
+        if pressed is not None:
+            samples.append(time.perf_counter() - pressed)
+    return samples, {}
+
+def run_events(config, core, desktop, workload):
+    """Presses delivered as input events through InputListener and HotkeyScheduler."""
+    samples = []
+    lock = threading.Lock()
+    done = threading.Condition(lock)
+    finished = [0]
+
+    def handle(style=None):
+        try:
+            core.process_selection(style)
+        finally:
+            pressed = desktop.take_press_time()
+            with lock:
+                if pressed is not None:
+                    samples.append(time.perf_counter() - pressed)
+                finished[0] += 1
+                done.notify_all()
+
+    keyboard = SyntheticKeyboard()
+    scheduler = HotkeyScheduler(config, handle)
+    listener = InputListener(config, scheduler.submit)
+    listener.find_all_keyboards = lambda: []
+    listener.start()
+    listener.add_device(keyboard)
+    hotkey = config.get("hotkey", "KEY_F9")
+    try:
+        for gap, line in workload:
+            time.sleep(gap)
+            desktop.select(line)
+            keyboard.press(hotkey)
+        # Let the listener hand over the last press, then wait for every accepted one
+        time.sleep(0.1)
+        with lock:
+            while True:
+                stats = scheduler.stats
+                accepted = stats["presses"] - stats["merged"] - stats["dropped"]
+                if finished[0] >= accepted:
+                    break
+                done.wait(1.0)
+    finally:
+        listener.stop()
+        scheduler.shutdown()
+        keyboard.close()
+    return samples, dict(scheduler.stats)
+
+def run_workload(name, args, seed):
+    rng = random.Random(seed)
+    workload = make_workload(name, args.presses, rng)
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    random.seed(seed)
+    metrics.configure({"metrics": {"enabled": True, "window": 100000}})
+    metrics.reset()
+
+    # A fresh cache per run, removed once it is closed
+    with tempfile.TemporaryDirectory(prefix="bench_hot_path_") as tmp, \
+            MockOpenAIServer(latency=args.latency, first_token=args.first_token, seed=seed) as server:
+        desktop = FakeDesktop(copy_delay=args.copy_delay)
+        quiet = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else quiet):
+            cache, clipboard, openai, core = build(config, server, desktop, args.output_mode,
+                                                   os.path.join(tmp, "cache.db"))
+            started = time.perf_counter()
+            if name == "burst":
+                samples, presses = run_events(config, core, desktop, workload)
+            elif name == "prefetch":
+                samples, presses = run_prefetched(core, desktop, workload)
+            else:
+                samples, presses = run_direct(core, desktop, workload)
+            elapsed = time.perf_counter() - started
+            prefetch_hits = core.stats["prefetch_hits"]
+            core.close()
+            openai.stop()
+            cache_stats = dict(cache.stats)
+            cache.close()
+        completions = server.stats["completions"]
+
+    samples.sort()
+    lookups = sum(cache_stats.values()) or 1
+    result = {
+        "presses": len(workload),
+        "handled": len(samples),
+        "merged": presses.get("merged", 0),
+        "dropped": presses.get("dropped", 0),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "api_calls": completions,
+        "hit_ratio": round(1.0 - cache_stats.get("miss", 0) / lookups, 3),
+        "prefetch_hits": prefetch_hits,
+    }
+    for q in QUANTILES:
+        result[f"p{int(q * 100)}_ms"] = round(percentile(samples, q) * 1000, 1)
+    stages = format_table(
+        (stage, label, count, quantiles) for stage, label, count, _, quantiles in metrics.snapshot()
+    )
+    return result, stages
+
+def compare(results, baseline, tolerance):
+    """Prints the change against baseline; returns the regressed workloads."""
+    regressed = []
+    print(f"\n{'workload':<10}{'p95 ms':>10}{'base':>10}{'change':>9}{'presses/s':>11}{'base':>8}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base:
+            print(f"{name:<10}  (no baseline)")
+            continue
+        p95_change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rate_change = result["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+        flag = ""
+        if p95_change > tolerance or rate_change < -tolerance:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<10}{result['p95_ms']:>10.1f}{base['p95_ms']:>10.1f}{p95_change:>+9.0%}"
+              f"{result['throughput']:>11.2f}{base['throughput']:>8.2f}{rate_change:>+9.0%}{flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default="repeat,rp-mix,burst,prefetch")
+    parser.add_argument("--presses", type=int, default=100)
+    parser.add_argument("--latency", default="lognormal:0.35:0.4", help="mock API latency distribution")
+    parser.add_argument("--first-token", default="fixed:0.05", help="mock time to first streamed token")
+    parser.add_argument("--copy-delay", default="uniform:0.005:0.03", help="time the window takes to answer Ctrl+C")
+    parser.add_argument("--output-mode", choices=["paste", "type", "chunked"], default="paste")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--stages", action="store_true", help="print the per-stage latency table")
+    parser.add_argument("--verbose", action="store_true", help="keep the translator's own output")
+    args = parser.parse_args()
+
+    print(f"{args.presses} presses per workload, mock latency {args.latency}, "
+          f"output {args.output_mode}, seed {args.seed}")
+    print(f"{'workload':<10}{'handled':>9}{'merged':>8}{'dropped':>9}{'api':>6}{'hit%':>7}"
+          f"{'presses/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    results = {}
+    failed = []
+    for name in args.workloads.split(","):
+        result, stages = run_workload(name, args, args.seed)
+        results[name] = result
+        print(f"{name:<10}{result['handled']:>9}{result['merged']:>8}{result['dropped']:>9}"
+              f"{result['api_calls']:>6}{result['hit_ratio']:>7.0%}{result['throughput']:>11.2f}"
+              f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}")
+        if args.stages:
+            print(stages + "\n")
+        if name == "prefetch" and result["prefetch_hits"] < result["presses"]:
+            failed.append(f"prefetch: only {result['prefetch_hits']} of {result['presses']} "
+                          "presses were served by their prefetch")
+
+    for failure in failed:
+        print(f"FAILED {failure}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        options = {key: getattr(args, key) for key in
+                   ("presses", "latency", "first_token", "copy_delay", "output_mode", "seed")}
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({"saved": time.strftime("%Y-%m-%d %H:%M:%S"), "options": options,
+                       "workloads": results}, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
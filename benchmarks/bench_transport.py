@@ -0,0 +1,56 @@
+"""
+First-request latency with and without connection warm-up, against the
+local mock server with a simulated handshake cost.
+
+    python benchmarks/bench_transport.py [--handshake fixed:0.15] [--requests 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer
+from src.openai_client import OpenAIClient
+
+def run(server, warmup, requests):
+    config = {"openai": {
+        "api_key": "mock", "model": "mock", "base_url": server.base_url,
+        "warmup": warmup, "keepalive_interval": 0
+    }}
+    client = OpenAIClient(config)
+    if warmup:
+        client.start()
+        # Give the background warm-up time to finish, as idle time before the first press would
+        time.sleep(0.5)
+
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        client.translate_text(f"halo dunia {i}", "Translate ({style}):", "strict")
+        samples.append(time.perf_counter() - started)
+    client.stop()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--handshake", default="fixed:0.15")
+    parser.add_argument("--latency", default="fixed:0.02")
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'first ms':>10}{'steady ms':>11}{'connections':>13}")
+    for warmup in (False, True):
+        with MockOpenAIServer(latency=args.latency, handshake=args.handshake) as server:
+            samples = run(server, warmup, args.requests)
+            steady = sorted(samples[1:])[len(samples[1:]) // 2] if len(samples) > 1 else samples[0]
+            print(
+                f"{'warm' if warmup else 'cold':<10}"
+                f"{samples[0] * 1000:>10.1f}"
+                f"{steady * 1000:>11.1f}"
+                f"{server.stats['connections']:>13}"
+            )
+
+if __name__ == "__main__":
+    main()
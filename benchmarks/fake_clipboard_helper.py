@@ -0,0 +1,25 @@
+"""
+In-memory clipboard helper speaking the HelperBackend protocol.
+Lets the clipboard backends be benchmarked headless:
+    clipboard.helper_command: "python benchmarks/fake_clipboard_helper.py"
+"""
+import sys
+
+def main():
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    content = b""
+
+    for line in stdin:
+        parts = line.split()
+        if not parts or parts[0] == b"QUIT":
+            break
+        if parts[0] == b"GET":
+            stdout.write(b"OK %d\n" % len(content) + content)
+        elif parts[0] == b"SET":
+            content = stdin.read(int(parts[1]))
+            stdout.write(b"OK 0\n")
+        stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+
+"""
+In-process stand-ins for the desktop the translator drives, so the hot path
+can be benchmarked headless and without root:
+
+- FakeDesktop: a focused window holding the selected line, plus the clipboard.
+  Ctrl+C copies the selection (after an optional delay, like a real app),
+  Ctrl+V and typed keys append to the window's output.
+- MemoryClipboardBackend: a clipboard backend over the desktop's clipboard.
+- RecordingUInput: takes the place of evdev.UInput and forwards every key
+  event to the desktop.
+- SyntheticKeyboard: an input device for InputListener that emits hotkey
+  presses on demand through a pipe, so select()/epoll work on it as usual.
+"""
+import os
+import time
+import threading
+from collections import deque
+from evdev import InputEvent, ecodes as e
+from benchmarks.mock_openai_server import parse_latency
+from src.key_typer import KEYMAP
+
+# (key, shift) -> character, to turn typed key events back into text
+TYPED = {value: ch for ch, value in KEYMAP.items()}
+
+class FakeDesktop:
+    def __init__(self, copy_delay="fixed:0"):
+        self.copy_delay = parse_latency(copy_delay)
+        self.selection = ""
+        self.selected_at = 0.0
+        self.clipboard = ""
+        self.output = []        # everything pasted or typed into the window, in order
+        self.copies = 0
+        self.pastes = 0
+        self._lock = threading.Lock()
+        # Per worker thread: when the press whose line it copied was made
+        self._copied = {}
+
+    def select(self, text, at=None):
+        """Selects text in the focused window, as the user would before pressing the hotkey."""
+        with self._lock:
+            self.selection = text
+            self.selected_at = time.perf_counter() if at is None else at
+
+    def take_press_time(self):
+        """perf_counter time of the press whose selection this thread copied, or None."""
+        with self._lock:
+            return self._copied.pop(threading.get_ident(), None)
+
+    def _set_clipboard(self, text):
+        with self._lock:
+            self.clipboard = text
+
+    def copy(self):
+        with self._lock:
+            self.copies += 1
+            text = self.selection
+            self._copied[threading.get_ident()] = self.selected_at
+        delay = self.copy_delay()
+        if delay > 0:
+            # The application answers Ctrl+C a moment later, as real ones do
+            threading.Timer(delay, self._set_clipboard, (text,)).start()
+        else:
+            self._set_clipboard(text)
+
+    def paste(self):
+        with self._lock:
+            self.pastes += 1
+            self.output.append(self.clipboard)
+
+    def type_char(self, ch):
+        with self._lock:
+            self.output.append(ch)
+
+    def backspace(self):
+        with self._lock:
+            if self.output:
+                last = self.output.pop()
+                if len(last) > 1:
+                    self.output.append(last[:-1])
+
+    def text(self):
+        with self._lock:
+            return "".join(self.output)
+
+class MemoryClipboardBackend:
+    """ClipboardHandler backend over FakeDesktop's clipboard."""
+    name = "memory"
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def available(self):
+        return True
+
+    def read(self):
+        return self.desktop.clipboard
+
+    def read_primary(self):
+        return self.desktop.selection
+
+    def write(self, text, serve_once=False):
+        self.desktop._set_clipboard(text)
+        return None
+
+    def close(self):
+        pass
+
+def use_memory_clipboard(clipboard, desktop):
+    """Points an existing ClipboardHandler at the desktop's in-memory clipboard."""
+    clipboard.backend = clipboard.fallback = MemoryClipboardBackend(desktop)
+    return clipboard
+
+class RecordingUInput:
+    """evdev.UInput stand-in: records events and acts on them like the focused window."""
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+        self.events = 0
+        self._held = set()
+
+    def write(self, etype, code, value):
+        self.events += 1
+        if etype != e.EV_KEY:
+            return
+        if value == 0:
+            self._held.discard(code)
+            return
+        self._held.add(code)
+        ctrl = e.KEY_LEFTCTRL in self._held
+        shift = e.KEY_LEFTSHIFT in self._held
+        if ctrl and code == e.KEY_C:
+            self.desktop.copy()
+        elif ctrl and code == e.KEY_V:
+            self.desktop.paste()
+        elif code == e.KEY_BACKSPACE:
+            self.desktop.backspace()
+        elif (code, shift) in TYPED:
+            self.desktop.type_char(TYPED[(code, shift)])
+
+    def syn(self):
+        pass
+
+    def close(self):
+        pass
+
+class SyntheticKeyboard:
+    """A fake evdev.InputDevice that emits key presses when press() is called."""
+
+    def __init__(self, name="synthetic keyboard"):
+        self.name = name
+        self.path = "/dev/input/synthetic"
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def fd(self):
+        return self._read_fd
+
+    def fileno(self):
+        return self._read_fd
+
+    def capabilities(self):
+        return {e.EV_KEY: sorted({key for key, _ in KEYMAP.values()} | {e.KEY_F9, e.KEY_F10, e.KEY_F11})}
+
+    def press(self, key_name="KEY_F9"):
+        code = e.ecodes[key_name]
+        sec, usec = divmod(int(time.time() * 1_000_000), 1_000_000)
+        with self._lock:
+            self._events.append(InputEvent(sec, usec, e.EV_KEY, code, 1))
+            self._events.append(InputEvent(sec, usec, e.EV_SYN, e.SYN_REPORT, 0))
+            self._events.append(InputEvent(sec, usec, e.EV_KEY, code, 0))
+            self._events.append(InputEvent(sec, usec, e.EV_SYN, e.SYN_REPORT, 0))
+        os.write(self._write_fd, b"\0")
+
+    def read(self):
+        try:
+            os.read(self._read_fd, 4096)
+        except BlockingIOError:
+            pass
+        with self._lock:
+            events, self._events = list(self._events), deque()
+        if not events:
+            raise BlockingIOError("no events")
+        return events
+
+    def close(self):
+        for fd in (self._read_fd, self._write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,270 @@
+
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Replies by upper-casing the user message (numbered batch lines keep their
+"[n]" prefixes), after a latency drawn from a configurable distribution.
+Supports streaming, /models, usage accounting, max_tokens truncation,
+injected 429/500 errors, malformed batch replies and a per-connection
+handshake delay (standing in for DNS + TCP + TLS setup).
+
+    python benchmarks/mock_openai_server.py --port 8765 --latency lognormal:0.3:0.5
+
+or from Python:
+
+    with MockOpenAIServer(latency="fixed:0.05") as server:
+        config["openai"]["base_url"] = server.base_url
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+def parse_latency(spec):
+    """
+    "fixed:S", "uniform:LO:HI", "normal:MEAN:SD" or "lognormal:MEDIAN:SIGMA" (seconds)
+    -> a zero-argument sampler.
+    """
+    kind, *params = str(spec).split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        import math
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+class MockOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed:0", first_token="fixed:0",
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=None, handshake="fixed:0",
+                 malformed_rate=0.0):
+        self.latency = parse_latency(latency)
+        self.handshake = parse_latency(handshake)
+        self.first_token = parse_latency(first_token)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "completions": 0, "connections": 0, "errors": 0,
+                      "rate_limited": 0, "malformed": 0}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+                time.sleep(server.handshake())
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                server._count("requests")
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                server._count("requests")
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                roll = server.random.random()
+                if roll < server.rate_limit_rate:
+                    server._count("rate_limited")
+                    self._send_json(
+                        429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {"Retry-After": str(server.retry_after)}
+                    )
+                    return
+                if roll < server.rate_limit_rate + server.error_rate:
+                    server._count("errors")
+                    self._send_json(500, {"error": {"message": "Injected failure"}})
+                    return
+
+                server._count("completions")
+                messages = request.get("messages", [])
+                user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+                reply = server.reply(user)
+                if server.random.random() < server.malformed_rate:
+                    reply = server.malform(reply)
+                finish_reason = "stop"
+                # Honour the output cap at the same chars/4 rate the usage numbers use
+                max_tokens = request.get("max_tokens")
+                if max_tokens and len(reply) > max_tokens * 4:
+                    reply = reply[:max_tokens * 4]
+                    finish_reason = "length"
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(reply) // 4 + 1,
+                    "total_tokens": prompt_tokens + len(reply) // 4 + 1,
+                    "prompt_tokens_details": {"cached_tokens": server.cached_tokens(messages)}
+                }
+                model = request.get("model", "mock")
+
+                if request.get("stream"):
+                    self._stream(model, reply, usage, request, finish_reason)
+                    return
+
+                time.sleep(server.latency())
+                self._send_json(200, {
+                    "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": finish_reason,
+                                 "message": {"role": "assistant", "content": reply}}],
+                    "usage": usage
+                })
+
+            def _stream(self, model, reply, usage, request, finish_reason="stop"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(payload):
+                    data = f"data: {payload}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                def chunk(delta, finish=None, extra=None):
+                    payload = {"id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                               "created": int(time.time()), "model": model,
+                               "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                    if extra:
+                        payload.update(extra)
+                    send(json.dumps(payload))
+
+                total = server.latency()
+                time.sleep(server.first_token())
+                words = reply.split(" ")
+                per_word = total / max(1, len(words))
+                chunk({"role": "assistant", "content": ""})
+                for i, word in enumerate(words):
+                    chunk({"content": word if i == 0 else " " + word})
+                    time.sleep(per_word)
+                chunk({}, finish_reason)
+                if request.get("stream_options", {}).get("include_usage"):
+                    send(json.dumps({"id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                                     "created": int(time.time()), "model": model,
+                                     "choices": [], "usage": usage}))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+        self._seen_prefixes = set()
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def reply(self, user):
+        return user.upper()
+
+    def malform(self, reply):
+        """Drops one entry from a batched (numbered-line or JSON) reply."""
+        try:
+            entries = json.loads(reply)
+        except ValueError:
+            entries = None
+        if isinstance(entries, dict) and len(entries) > 1:
+            del entries[self.random.choice(list(entries))]
+            self._count("malformed")
+            return json.dumps(entries)
+        lines = reply.split("\n")
+        if len(lines) > 1:
+            del lines[self.random.randrange(len(lines))]
+            self._count("malformed")
+        return "\n".join(lines)
+
+    def cached_tokens(self, messages):
+        """
+        Pretend prefix caching: the longest run of leading system messages
+        seen before counts as cached.
+        """
+        cached = 0
+        prefix = ""
+        with self._lock:
+            for message in messages:
+                if message.get("role") != "system":
+                    break
+                prefix += str(message.get("content", "")) + "\x00"
+                if prefix in self._seen_prefixes:
+                    cached = len(prefix) // 4
+                self._seen_prefixes.add(prefix)
+        return cached
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.3:0.5")
+    parser.add_argument("--first-token", default="fixed:0.05")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--handshake", default="fixed:0")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.first_token,
+                              args.error_rate, args.rate_limit_rate, handshake=args.handshake,
+                              malformed_rate=args.malformed_rate)
+    print(f"Mock OpenAI API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -2,46 +2,173 @@
 import sys
 import time
 import signal
+import argparse
+
+# Start the clock before anything heavy is imported
+LAUNCHED = time.perf_counter()
+
 from src.config_loader import load_config
-from src.cache_layer import CacheLayer
-from src.clipboard_handler import ClipboardHandler
-from src.openai_client import OpenAIClient
+from src.metrics import metrics, summarize
+from src.startup import StartupTimer, DeferredHandler, build_services, close_services, preload
 from src.input_listener import InputListener
-from src.translator_core import TranslatorCore
+from src.hotkey_scheduler import HotkeyScheduler
+
+def run_pack_command(config, args):
+    from src.cache_pack import CachePack
+
+    if args.action == "info":
+        pack = CachePack(args.path)
+        print(pack.info())
+        pack.close()
+        return
+
+    from src.cache_layer import CacheLayer
+    options = dict(config["cache"], packs=[])
+    cache = CacheLayer(db_path=config["cache"]["db_path"], options=options)
+    try:
+        if args.action == "export":
+            count = cache.export_pack(args.path, args.min_hits)
+            print(f"Exported {count} entries to {args.path}.")
+        else:
+            total, changed = cache.import_pack(args.path, args.conflict)
+            print(f"Imported {args.path}: {changed} of {total} entries added or updated ({args.conflict}).")
+    finally:
+        cache.close()
+
+def compile_phrase_table(config):
+    from src.cache_layer import CacheLayer
+    from src.phrase_table import compile_phrases
+
+    settings = config.get("phrase_table", {})
+    cache = CacheLayer(db_path=config["cache"]["db_path"], options=dict(config["cache"], packs=[]))
+    try:
+        logs = cache.logs()
+        hits = cache.phrase_evidence()
+        phrases = compile_phrases(logs, int(settings.get("min_count", 3)),
+                                  float(settings.get("min_confidence", 0.8)), hits)
+        cache.save_phrases(phrases)
+        scopes = len({phrase[0] for phrase in phrases})
+        reused = sum(1 for phrase in phrases if phrase[5])
+        print(f"Compiled {len(phrases)} phrases in {scopes} style/mode scopes from {len(logs)} logged "
+              f"translations; {reused} of them were also reused from the cache.")
+    finally:
+        cache.close()
 
 def main():
-    print("Starting Arch Translator Tool...")
-    
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="run the hotkey translator (default)")
+    report = commands.add_parser("metrics", help="latency per stage from recorded metrics")
+    report.add_argument("--hours", type=float, default=24)
+    pack = commands.add_parser("pack", help="export, import or inspect shareable cache packs")
+    pack.add_argument("action", choices=["export", "import", "info"])
+    pack.add_argument("path")
+    pack.add_argument("--min-hits", type=int, default=0, help="export: only entries hit this often")
+    pack.add_argument("--conflict", choices=["keep", "replace", "newest"], default="keep",
+                      help="import: which translation wins for a phrase cached on both sides")
+    phrases = commands.add_parser("phrases", help="compile the phrase table from the translation log")
+    phrases.add_argument("action", choices=["compile"])
+    args = parser.parse_args()
+
+    timer = StartupTimer(LAUNCHED)
+
     # 1. Load Config
-    config = load_config()
-    
-    # 2. Initialize Components
-    cache = CacheLayer(db_path=config["cache"]["db_path"])
-    clipboard = ClipboardHandler()
-    openai = OpenAIClient(config)
-    
-    # 3. Initialize Core Logic
-    core = TranslatorCore(config, cache, clipboard, openai)
-    
-    # 4. Initialize Input Listener
-    def hotkey_callback():
-        core.process_selection()
-
-    listener = InputListener(config, hotkey_callback)
-    listener.start()
-
-    print("\nRunning. Press Ctrl+C to exit.")
-    
-    # Keep main thread alive
+    config = timer.timed("config", load_config)
+
+    if args.command == "metrics":
+        print(summarize(config["cache"]["db_path"], args.hours))
+        return
+
+    if args.command == "pack":
+        run_pack_command(config, args)
+        return
+
+    if args.command == "phrases":
+        compile_phrase_table(config)
+        return
+
+    print("Starting Arch Translator Tool...")
+    settings = config.get("startup", {})
+    deferred = bool(settings.get("deferred", True))
+    metrics.configure(config)
+
+    # Presses run on a bounded worker pool; bursts are debounced and merged.
+    # Until the translator is built, a press waits on its worker instead of failing.
+    handler = DeferredHandler(float(settings.get("ready_timeout", 30)))
+    scheduler = HotkeyScheduler(config, handler)
+    listener = InputListener(config, scheduler.submit)
+    cache = clipboard = openai = core = prefetcher = None
+
+    # Treat SIGTERM (e.g. systemd stop) like Ctrl+C so pending cache writes are flushed
+    def handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
     try:
+        if deferred:
+            # 2. Arm the hotkey first; the OpenAI SDK imports meanwhile
+            preload()
+            timer.timed("listener", listener.start)
+            timer.mark("hotkey live")
+
+        # 3. Cache, clipboard, OpenAI client and core (concurrently when deferred)
+        try:
+            cache, clipboard, openai, core = build_services(config, timer, parallel=deferred)
+        except Exception as e:
+            print(f"Start-up failed: {e}")
+            handler.fail()
+            raise KeyboardInterrupt
+
+        # Stage timings are kept in the cache database for `main.py metrics`
+        metrics.sink = cache.record_metrics
+        metrics.start()
+
+        if not deferred:
+            timer.timed("listener", listener.start)
+            timer.mark("hotkey live")
+        handler.ready(core.process_selection)
+        timer.mark("ready")
+
+        # 4. Optional speculative pre-translation of copied text
+        from src.prefetch_watcher import PrefetchWatcher
+        prefetcher = PrefetchWatcher(config, clipboard, core)
+        prefetcher.start()
+
+        timer.publish()
+        print(timer.report())
+        print("\nRunning. Press Ctrl+C to exit.")
+
+        # Keep main thread alive
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         print("\nStopping...")
+    finally:
         listener.stop()
-        core.close()
-        cache.close()
-        sys.exit(0)
+        # A press or prefetch still running must finish before the services it uses close
+        shutdown_timeout = float(settings.get("shutdown_timeout", 10))
+        if prefetcher:
+            prefetcher.stop(shutdown_timeout)
+        if not scheduler.shutdown(shutdown_timeout):
+            print("A hotkey press is still running; shutting down anyway.")
+        if core is not None:
+            print("Hotkey presses: " + ", ".join(f"{kind}={count}" for kind, count in scheduler.stats.items())
+                  + f", shared API calls={core.pipeline.inflight.shared}")
+            if prefetcher and prefetcher.enabled:
+                print("Prefetch: " + ", ".join(f"{kind}={count}" for kind, count in prefetcher.stats.items())
+                      + f", hits from prefetch={core.stats['prefetch_hits']}")
+            print(openai.report())
+            if core.pipeline.phrases is not None:
+                print(core.pipeline.phrases.report())
+            print("Cache lookups: " + ", ".join(f"{kind}={count}" for kind, count in cache.stats.items()))
+        # Stage timings go to the cache, so they are flushed before it closes
+        metrics.stop()
+        if metrics.enabled:
+            print(metrics.report())
+        # The cache goes last: closing it flushes any write-behind batch still queued
+        close_services(cache, clipboard, openai, core)
+    sys.exit(0 if core is not None else 1)
 
 if __name__ == "__main__":
     main()
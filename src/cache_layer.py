@@ -2,92 +2,781 @@
 import sqlite3
 import hashlib
 import os
+import threading
+import queue
+import time
+from collections import OrderedDict
+from src.text_normalizer import normalize, transplant_punctuation
+from src.fuzzy_index import FuzzyIndex
+from src.cache_pack import CachePack, write_pack
+from src.metrics import metrics
+
+# Bump together with a new step in CacheLayer._migrate
+SCHEMA_VERSION = 6
+
+class MemoryCache:
+    """Bounded in-process LRU of key -> translation, safe to share between threads."""
+
+    def __init__(self, max_entries=2048, max_bytes=4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _sizeof(self, key, value):
+        return len(key) + len(value.encode('utf-8'))
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+
+        size = self._sizeof(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._data[key] = value
+            self._bytes += size
+
+            # Evict least recently used entries until both limits hold
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, old_value = self._data.popitem(last=False)
+                self._bytes -= self._sizeof(old_key, old_value)
+
+    def _remove(self, key):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= self._sizeof(key, old)
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def warm(self, rows):
+        """Fill from (key, value) rows ordered hottest first, stopping once full."""
+        selected = []
+        total = 0
+        for key, value in rows:
+            size = self._sizeof(key, value)
+            if len(selected) >= self.max_entries or total + size > self.max_bytes:
+                break
+            selected.append((key, value))
+            total += size
+
+        # Insert coldest first so the hottest rows end up most recently used
+        for key, value in reversed(selected):
+            self.put(key, value)
+
+    def __len__(self):
+        return len(self._data)
 
 class CacheLayer:
-    def __init__(self, db_path="rp_translator.db"):
+    def __init__(self, db_path="rp_translator.db", options=None):
         self.db_path = db_path
+        self.options = options or {}
         self.conn = None
+
+        # One lock serialises every use of the shared read connection
+        self._lock = threading.RLock()
+        self.memory = MemoryCache(
+            max_entries=int(self.options.get("memory_entries", 2048)),
+            max_bytes=int(float(self.options.get("memory_mb", 4)) * 1024 * 1024)
+        )
+
+        # Write-behind: cache inserts and log rows are committed in batches by a
+        # background thread so the hotkey thread never waits on disk
+        self.write_behind = bool(self.options.get("write_behind", True))
+        self.flush_interval = float(self.options.get("flush_interval", 0.5))
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._writer_conn = None
+        self._writer = None
+
+        # Retention: TTL, size budget and log cap, enforced by _maintain()
+        self.ttl = float(self.options.get("ttl_days", 0)) * 86400
+        self.max_rows = int(self.options.get("max_rows", 0))
+        self.max_bytes = int(float(self.options.get("max_mb", 0)) * 1024 * 1024)
+        self.eviction = str(self.options.get("eviction", "lru")).lower()
+        self.max_log_rows = int(self.options.get("max_log_rows", 0))
+        self.max_metric_rows = int(self.options.get("max_metric_rows", 0))
+        self.maintenance_interval = float(self.options.get("maintenance_interval", 600))
+        self._next_maintenance = 0.0
+
+        # Lookup tiers: exact key, normalized key, then (optionally) fuzzy match
+        self.normalize = bool(self.options.get("normalize", True))
+        self.fuzzy = None
+        threshold = float(self.options.get("fuzzy_threshold", 0))
+        if self.normalize and threshold > 0:
+            self.fuzzy = FuzzyIndex(
+                threshold=threshold,
+                max_entries=int(self.options.get("fuzzy_max_entries", 20000)),
+                min_chars=int(self.options.get("fuzzy_min_chars", 12))
+            )
+        self.stats = {"exact": 0, "normalized": 0, "pack": 0, "fuzzy": 0, "miss": 0}
+        self._stats_lock = threading.Lock()
+
+        # Read-only shared packs, consulted after the local cache misses
+        self.packs = []
+        for path in self.options.get("packs") or []:
+            self.attach_pack(path)
+
         self._init_db()
+        self._warm_memory()
+        self._build_fuzzy_index()
+        self._start_writer()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        c = conn.cursor()
+        journal_mode = self.options.get("journal_mode", "WAL")
+        if journal_mode:
+            c.execute(f"PRAGMA journal_mode={journal_mode}")
+        synchronous = self.options.get("synchronous", "NORMAL")
+        if synchronous:
+            c.execute(f"PRAGMA synchronous={synchronous}")
+        return conn
 
     def _init_db(self):
-        """Initialize the SQLite database and create tables if they don't exist."""
+        """Initialize the SQLite database and migrate it to the current schema."""
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn = self._connect()
             c = self.conn.cursor()
-            
-            # Cache table
-            c.execute("""
-            CREATE TABLE IF NOT EXISTS cache (
-                hash TEXT PRIMARY KEY,
-                result TEXT
-            )
-            """)
-            
-            # Logs table for debugging/history
-            c.execute("""
-            CREATE TABLE IF NOT EXISTS logs (
-                time TEXT DEFAULT CURRENT_TIMESTAMP,
-                original TEXT,
-                result TEXT,
-                style TEXT
-            )
-            """)
-            
-            self.conn.commit()
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._migrate(version)
         except Exception as e:
             print(f"Error initializing database: {e}")
 
+    def _migrate(self, version):
+        """Upgrade the schema one version at a time inside a single transaction."""
+        c = self.conn.cursor()
+        existing = {
+            row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+
+        with self.conn:
+            c.execute("BEGIN")
+            if version < 1:
+                # v1: the original layout (hex TEXT keys, unbounded tables)
+                c.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    hash TEXT PRIMARY KEY,
+                    result TEXT
+                )
+                """)
+
+                # Logs table for debugging/history
+                c.execute("""
+                CREATE TABLE IF NOT EXISTS logs (
+                    time TEXT DEFAULT CURRENT_TIMESTAMP,
+                    original TEXT,
+                    result TEXT,
+                    style TEXT
+                )
+                """)
+
+            if version < 2:
+                # v2: 32-byte binary digests in a WITHOUT ROWID table plus hit statistics
+                c.execute("""
+                CREATE TABLE cache_v2 (
+                    key BLOB PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created INTEGER NOT NULL,
+                    last_hit INTEGER NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+                """)
+
+                now = int(time.time())
+                rows = c.execute("SELECT hash, result FROM cache").fetchall()
+                c.executemany(
+                    "INSERT OR IGNORE INTO cache_v2 (key, result, created, last_hit) VALUES (?,?,?,?)",
+                    (
+                        (bytes.fromhex(h), result, now, now)
+                        for h, result in rows
+                        if h and result is not None
+                    )
+                )
+                c.execute("DROP TABLE cache")
+                c.execute("ALTER TABLE cache_v2 RENAME TO cache")
+                c.execute("CREATE INDEX IF NOT EXISTS cache_last_hit ON cache (last_hit)")
+
+                if "cache" in existing:
+                    print(f"Migrated {len(rows)} cache entries to schema v2.")
+
+            if version < 3:
+                # v3: normalized rows remember their text and scope for the fuzzy index
+                c.execute("ALTER TABLE cache ADD COLUMN norm TEXT")
+                c.execute("ALTER TABLE cache ADD COLUMN scope TEXT")
+
+            if version < 4:
+                # v4: per-stage latency samples for `main.py metrics`
+                c.execute("""
+                    CREATE TABLE IF NOT EXISTS stage_metrics (
+                        at REAL,
+                        stage TEXT,
+                        label TEXT,
+                        seconds REAL
+                    )
+                """)
+                c.execute("CREATE INDEX IF NOT EXISTS stage_metrics_at ON stage_metrics (at)")
+
+            if version < 5:
+                # v5: phrases compiled from the logs (`main.py phrases compile`)
+                c.execute("""
+                    CREATE TABLE IF NOT EXISTS phrase_table (
+                        scope TEXT NOT NULL,
+                        norm TEXT NOT NULL,
+                        result TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        confidence REAL NOT NULL,
+                        PRIMARY KEY (scope, norm)
+                    ) WITHOUT ROWID
+                """)
+
+            if version < 6:
+                # v6: how often each phrase was reused from the cache, kept apart from count
+                c.execute("ALTER TABLE phrase_table ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+
+            c.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+        if version < 2:
+            # Let eviction hand pages back to the filesystem; this needs one full VACUUM
+            c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            c.execute("VACUUM")
+
+    def _warm_memory(self):
+        """Preload the in-memory layer with the most recently hit entries."""
+        if not self.conn or self.memory.max_entries <= 0:
+            return
+
+        try:
+            with self._lock:
+                c = self.conn.cursor()
+                c.execute(
+                    "SELECT key, result FROM cache ORDER BY last_hit DESC, hit_count DESC LIMIT ?",
+                    (self.memory.max_entries,)
+                )
+                rows = c.fetchall()
+            self.memory.warm(rows)
+        except Exception as e:
+            print(f"Cache warm-up error: {e}")
+
+    def _build_fuzzy_index(self):
+        """Index the normalized texts of the hottest rows for similarity lookup."""
+        if not self.conn or self.fuzzy is None:
+            return
+
+        try:
+            with self._lock:
+                c = self.conn.cursor()
+                c.execute(
+                    "SELECT key, norm, scope FROM cache WHERE norm IS NOT NULL ORDER BY last_hit DESC LIMIT ?",
+                    (self.fuzzy.max_entries,)
+                )
+                rows = c.fetchall()
+            # Oldest first, so the hottest rows are the last to be dropped
+            for key, norm, scope in reversed(rows):
+                self.fuzzy.add(norm, scope, key)
+        except Exception as e:
+            print(f"Fuzzy index build error: {e}")
+
+    def _start_writer(self):
+        if not self.conn:
+            return
+
+        if not self.write_behind:
+            self._maintain_if_due(self.conn)
+            return
+
+        try:
+            self._writer_conn = self._connect()
+        except Exception as e:
+            print(f"Cache writer connection error: {e}. Falling back to synchronous writes.")
+            self.write_behind = False
+            self._maintain_if_due(self.conn)
+            return
+
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self):
+        """Collect queued writes and commit them once per flush window."""
+        self._maintain_if_due(self._writer_conn)
+
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=max(0.0, self._next_maintenance - time.monotonic()))
+            except queue.Empty:
+                self._maintain_if_due(self._writer_conn)
+                continue
+
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather everything that arrives within the flush window
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+                if not running or waiters:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            # Drain whatever is already queued so a flush/stop leaves nothing behind
+            while not running or waiters:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+            if batch:
+                with metrics.span("cache.write_batch"):
+                    self._write_batch(self._writer_conn, batch)
+            for waiter in waiters:
+                waiter.set()
+            # A steady stream of writes never lets the queue go idle
+            if running:
+                self._maintain_if_due(self._writer_conn)
+
+        try:
+            self._writer_conn.close()
+        except Exception:
+            pass
+
+    def _write_batch(self, conn, batch):
+        """Apply queued cache, hit, log and metric writes in a single transaction."""
+        now = int(time.time())
+        cache_rows = [op[1:] for op in batch if op[0] == "cache"]
+        log_rows = [op[1:] for op in batch if op[0] == "log"]
+        metric_rows = [row for op in batch if op[0] == "metrics" for row in op[1]]
+
+        hits = {}
+        for op in batch:
+            if op[0] == "hit":
+                hits[op[1]] = hits.get(op[1], 0) + 1
+
+        try:
+            with conn:
+                if cache_rows:
+                    conn.executemany(
+                        """
+                        INSERT INTO cache (key, result, created, last_hit, norm, scope) VALUES (?,?,?,?,?,?)
+                        ON CONFLICT(key) DO UPDATE SET result=excluded.result, last_hit=excluded.last_hit
+                        """,
+                        [(key, result, now, now, norm, scope) for key, result, norm, scope in cache_rows]
+                    )
+                if hits:
+                    conn.executemany(
+                        "UPDATE cache SET hit_count = hit_count + ?, last_hit = ? WHERE key = ?",
+                        [(count, now, key) for key, count in hits.items()]
+                    )
+                if log_rows:
+                    conn.executemany(
+                        "INSERT INTO logs (original, result, style) VALUES (?,?,?)",
+                        log_rows
+                    )
+                if metric_rows:
+                    conn.executemany(
+                        "INSERT INTO stage_metrics (at, stage, label, seconds) VALUES (?,?,?,?)",
+                        metric_rows
+                    )
+        except Exception as e:
+            print(f"Cache write error: {e}")
+        finally:
+            with self._lock:
+                for key, result, _, _ in cache_rows:
+                    if self._pending.get(key) == result:
+                        del self._pending[key]
+
+    def _maintain(self, conn):
+        """
+        Apply TTL, the row/byte budget and the log cap, then reclaim free pages.
+        Evicted rows are also dropped from the memory tier and the fuzzy index,
+        which would otherwise keep serving them.
+        """
+        try:
+            removed = 0
+            evicted = []   # (key, norm, scope)
+            with conn:
+                if self.ttl > 0:
+                    cutoff = int(time.time() - self.ttl)
+                    evicted += conn.execute(
+                        "DELETE FROM cache WHERE last_hit < ? RETURNING key, norm, scope", (cutoff,)
+                    ).fetchall()
+
+                rows, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(length(key) + length(CAST(result AS BLOB))), 0) FROM cache"
+                ).fetchone()
+
+                excess = 0
+                if self.max_rows > 0 and rows > self.max_rows:
+                    excess = rows - self.max_rows
+                if self.max_bytes > 0 and size > self.max_bytes and rows:
+                    average = size / rows
+                    excess = max(excess, int((size - self.max_bytes) / average) + 1)
+
+                if excess > 0:
+                    # Trim a little further than needed so eviction doesn't run on every pass
+                    excess = min(rows, excess + rows // 20)
+                    if self.eviction == "lfu":
+                        order = "hit_count ASC, last_hit ASC"
+                    else:
+                        order = "last_hit ASC"
+                    evicted += conn.execute(
+                        f"DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY {order} LIMIT ?) "
+                        "RETURNING key, norm, scope",
+                        (excess,)
+                    ).fetchall()
+
+                if self.max_log_rows > 0:
+                    removed += conn.execute(
+                        "DELETE FROM logs WHERE rowid <= (SELECT MAX(rowid) FROM logs) - ?",
+                        (self.max_log_rows,)
+                    ).rowcount
+
+                if self.max_metric_rows > 0:
+                    removed += conn.execute(
+                        "DELETE FROM stage_metrics WHERE rowid <= (SELECT MAX(rowid) FROM stage_metrics) - ?",
+                        (self.max_metric_rows,)
+                    ).rowcount
+
+            for key, norm, scope in evicted:
+                self.memory.discard(key)
+                if self.fuzzy is not None and norm is not None:
+                    self.fuzzy.discard(norm, scope)
+
+            removed += len(evicted)
+            if removed:
+                conn.execute("PRAGMA incremental_vacuum")
+                print(f"Cache maintenance removed {removed} rows.")
+        except Exception as e:
+            print(f"Cache maintenance error: {e}")
+
+    def _maintain_if_due(self, conn):
+        """Run _maintain() when maintenance_interval has passed since the last pass."""
+        if time.monotonic() < self._next_maintenance:
+            return
+        self._maintain(conn)
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+
+    def _enqueue(self, op):
+        if self._writer:
+            self._queue.put(op)
+        else:
+            with self._lock:
+                self._write_batch(self.conn, [op])
+                self._maintain_if_due(self.conn)
+
     def _hash_text(self, text, style):
-        """Create a unique hash for the text and style combination."""
+        """Create a unique binary digest for the text and style combination."""
         key = f"{style}::{text}"
-        return hashlib.sha256(key.encode()).hexdigest()
+        return hashlib.sha256(key.encode()).digest()
 
-    def get(self, text, style):
-        """Retrieve a translation from the cache."""
+    def _hash_normalized(self, norm, style):
+        """Digest for a normalized text; a separate namespace from exact keys."""
+        key = f"norm::{style}::{norm}"
+        return hashlib.sha256(key.encode()).digest()
+
+    def _count(self, kind, record=True):
+        if not record:
+            return
+        with self._stats_lock:
+            self.stats[kind] += 1
+
+    def _get_key(self, h, record=True):
+        """Look a digest up in memory, the unflushed writes, then SQLite."""
+        cached = self.memory.get(h)
+        if cached is None:
+            with self._lock:
+                # Written but not yet flushed to disk
+                cached = self._pending.get(h)
+                if cached is None:
+                    c = self.conn.cursor()
+                    c.execute("SELECT result FROM cache WHERE key=?", (h,))
+                    row = c.fetchone()
+                    if not row:
+                        return None
+                    cached = row[0]
+            self.memory.put(h, cached)
+
+        if record:
+            self._enqueue(("hit", h))
+        return cached
+
+    def lookup(self, text, style, record=True):
+        """
+        Retrieve a translation and how it was found.
+        Returns (result, kind) with kind one of "exact", "normalized", "fuzzy",
+        or (None, "miss"). record=False leaves hit statistics untouched.
+        """
+        with metrics.span("cache.lookup") as span:
+            result, kind = self._lookup(text, style, record)
+            span.label = kind
+            return result, kind
+
+    def _lookup(self, text, style, record):
         if not self.conn:
-            return None
-            
+            return None, "miss"
+
         try:
-            h = self._hash_text(text, style)
-            c = self.conn.cursor()
-            c.execute("SELECT result FROM cache WHERE hash=?", (h,))
-            row = c.fetchone()
-            return row[0] if row else None
+            cached = self._get_key(self._hash_text(text, style), record)
+            if cached is not None:
+                self._count("exact", record)
+                if record and self.normalize:
+                    # Also count the reuse on the normalized row, whose hit_count
+                    # pack export and the phrase compiler read
+                    self._enqueue(("hit", self._hash_normalized(normalize(text), style)))
+                return cached, "exact"
+
+            norm = normalize(text) if self.normalize else None
+            if norm is not None:
+                h = self._hash_normalized(norm, style)
+                cached = self._get_key(h, record)
+                if cached is not None:
+                    self._count("normalized", record)
+                    return transplant_punctuation(cached, text), "normalized"
+
+                for pack in self.packs:
+                    cached = pack.get(h, norm, style)
+                    if cached is not None:
+                        self._count("pack", record)
+                        return transplant_punctuation(cached, text), "pack"
+
+            if self.fuzzy is not None:
+                match = self.fuzzy.find(norm, style)
+                if match:
+                    cached = self._get_key(match[0], record)
+                    if cached is not None:
+                        self._count("fuzzy", record)
+                        print(f"Fuzzy cache match ({match[1]:.2f} similar).")
+                        return transplant_punctuation(cached, text), "fuzzy"
+
+            self._count("miss", record)
+            return None, "miss"
         except Exception as e:
             print(f"Cache get error: {e}")
-            return None
+            return None, "miss"
+
+    def get(self, text, style):
+        """Retrieve a translation from the cache."""
+        return self.lookup(text, style)[0]
+
+    def _store(self, h, result, norm=None, scope=None):
+        self.memory.put(h, result)
+        if self._writer:
+            with self._lock:
+                self._pending[h] = result
+        self._enqueue(("cache", h, result, norm, scope))
 
     def set(self, text, style, result):
         """Save a translation to the cache."""
         if not self.conn:
             return
-            
+
         try:
-            h = self._hash_text(text, style)
-            c = self.conn.cursor()
-            c.execute(
-                "INSERT OR REPLACE INTO cache (hash, result) VALUES (?,?)",
-                (h, result)
-            )
-            self.conn.commit()
+            self._store(self._hash_text(text, style), result)
+            if not self.normalize:
+                return
+
+            norm = normalize(text)
+            h = self._hash_normalized(norm, style)
+            self._store(h, result, norm, style)
+            if self.fuzzy is not None:
+                self.fuzzy.add(norm, style, h)
         except Exception as e:
             print(f"Cache set error: {e}")
 
+    def record_metrics(self, rows):
+        """Persist (time, stage, label, seconds) latency samples."""
+        if not self.conn:
+            return
+
+        try:
+            self._enqueue(("metrics", rows))
+        except Exception as e:
+            print(f"Metrics write error: {e}")
+
     def log(self, original, result, style):
         """Log the translation event."""
         if not self.conn:
             return
-            
+
         try:
-            c = self.conn.cursor()
-            c.execute(
-                "INSERT INTO logs (original, result, style) VALUES (?,?,?)",
-                (original, result, style)
-            )
-            self.conn.commit()
+            self._enqueue(("log", original, result, style))
         except Exception as e:
             print(f"Logging error: {e}")
 
+    def attach_pack(self, path):
+        """Adds a read-only pack to the lookup chain; returns it, or None if unusable."""
+        try:
+            pack = CachePack(path)
+        except (OSError, ValueError) as e:
+            print(f"Cache pack {path} not attached: {e}")
+            return None
+        self.packs.append(pack)
+        print(f"Attached cache pack {path} ({pack.count} entries).")
+        return pack
+
+    def export_pack(self, path, min_hits=0):
+        """
+        Writes every normalized entry hit at least min_hits times to a pack.
+        Returns the number of entries exported.
+        """
+        if not self.conn:
+            return 0
+
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, norm, scope, result, created, hit_count FROM cache "
+                "WHERE norm IS NOT NULL AND scope IS NOT NULL AND hit_count >= ?",
+                (min_hits,)
+            ).fetchall()
+        return write_pack(path, rows)
+
+    def import_pack(self, path, conflict="keep"):
+        """
+        Merges a pack into the local cache in one transaction.
+        conflict decides what happens when a key is already cached:
+        "keep" the local translation, "replace" it with the pack's, or keep
+        the "newest" of the two. Returns (entries in pack, rows changed).
+        """
+        if not self.conn:
+            return 0, 0
+
+        updates = {
+            "keep": "DO NOTHING",
+            "replace": "DO UPDATE SET result=excluded.result, created=excluded.created",
+            "newest": "DO UPDATE SET result=excluded.result, created=excluded.created "
+                      "WHERE excluded.created > cache.created",
+        }
+        if conflict not in updates:
+            raise ValueError(f"unknown conflict rule '{conflict}' (keep, replace or newest)")
+
+        pack = CachePack(path)
+        try:
+            now = int(time.time())
+            rows = [
+                (self._hash_normalized(norm, scope), result, created, now, hits, norm, scope)
+                for norm, scope, result, created, hits in pack
+            ]
+        finally:
+            pack.close()
+
+        # Queued writes land first, so the conflict rule sees the current local rows
+        self.flush()
+        with self._lock:
+            before = self.conn.total_changes
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO cache (key, result, created, last_hit, hit_count, norm, scope) "
+                    f"VALUES (?,?,?,?,?,?,?) ON CONFLICT(key) {updates[conflict]}",
+                    rows
+                )
+            changed = self.conn.total_changes - before
+
+        for key, _, _, _, _, norm, scope in rows:
+            self.memory.discard(key)
+            if self.fuzzy is not None:
+                self.fuzzy.add(norm, scope, key)
+        return len(rows), changed
+
+    def logs(self):
+        """Every logged (original, result, style) translation, oldest first."""
+        if not self.conn:
+            return []
+
+        self.flush()
+        with self._lock:
+            return self.conn.execute("SELECT original, result, style FROM logs ORDER BY rowid").fetchall()
+
+    def phrase_evidence(self):
+        """(scope, norm, result, hit_count) of every normalized entry that was reused."""
+        if not self.conn:
+            return []
+
+        self.flush()
+        with self._lock:
+            return self.conn.execute(
+                "SELECT scope, norm, result, hit_count FROM cache "
+                "WHERE norm IS NOT NULL AND scope IS NOT NULL AND hit_count > 0"
+            ).fetchall()
+
+    def save_phrases(self, phrases):
+        """Replaces the phrase table with [(scope, norm, result, count, confidence, hits)]."""
+        if not self.conn:
+            return
+
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM phrase_table")
+                self.conn.executemany(
+                    "INSERT INTO phrase_table (scope, norm, result, count, confidence, hits) VALUES (?,?,?,?,?,?)",
+                    phrases
+                )
+
+    def load_phrases(self, min_count=0, min_confidence=0.0):
+        """[(scope, norm, result)] for phrases that meet both thresholds."""
+        if not self.conn:
+            return []
+
+        try:
+            with self._lock:
+                return self.conn.execute(
+                    "SELECT scope, norm, result FROM phrase_table WHERE count >= ? AND confidence >= ?",
+                    (min_count, min_confidence)
+                ).fetchall()
+        except Exception as e:
+            print(f"Phrase table load error: {e}")
+            return []
+
+    def flush(self, timeout=5.0):
+        """Block until every queued write has been committed."""
+        if not self._writer or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
     def close(self):
-        if self.conn:
-            self.conn.close()
+        if self._writer and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+        self._writer = None
+
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+        for pack in self.packs:
+            pack.close()
+        self.packs = []
@@ -0,0 +1,156 @@
+
+import os
+import mmap
+import time
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+
+# File layout (little endian):
+#   header   magic, version, flags, entry count, block count, block table offset,
+#            index offset, created
+#   blocks   zlib-compressed runs of entry payloads
+#   table    per block: file offset, compressed length
+#   index    per entry, sorted by key: 16-byte key, block, offset and length in the block
+# The index is fixed-width and uncompressed, so a pack is searched in place
+# through mmap and only the one block holding a match is inflated.
+MAGIC = b"RPTPACK\0"
+PACK_VERSION = 1
+HEADER = struct.Struct("<8sHHIIQQQ")
+BLOCK = struct.Struct("<QI")
+INDEX = struct.Struct("<16sIII")
+PAYLOAD = struct.Struct("<IIHH")   # created, hit count, norm bytes, scope bytes; result follows
+KEY_BYTES = 16
+BLOCK_BYTES = 32 * 1024
+
+def pack_key(digest):
+    """Index key for a normalized cache digest (CacheLayer._hash_normalized)."""
+    return digest[:KEY_BYTES]
+
+def write_pack(path, entries, level=9):
+    """
+    Writes entries [(digest, norm, scope, result, created, hit_count)] as a
+    pack, replacing path atomically. Returns the number of entries written.
+    """
+    entries = sorted(entries, key=lambda entry: pack_key(entry[0]))
+    index = []
+    blocks = []
+    raw = bytearray()
+
+    def close_block():
+        if raw:
+            blocks.append(zlib.compress(bytes(raw), level))
+            raw.clear()
+
+    for digest, norm, scope, result, created, hits in entries:
+        norm_bytes = norm.encode('utf-8')
+        scope_bytes = scope.encode('utf-8')
+        payload = (PAYLOAD.pack(int(created) & 0xFFFFFFFF, min(int(hits), 0xFFFFFFFF),
+                                len(norm_bytes), len(scope_bytes))
+                   + norm_bytes + scope_bytes + result.encode('utf-8'))
+        if raw and len(raw) + len(payload) > BLOCK_BYTES:
+            close_block()
+        index.append(INDEX.pack(pack_key(digest), len(blocks), len(raw), len(payload)))
+        raw += payload
+    close_block()
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(b"\0" * HEADER.size)
+        table = []
+        for block in blocks:
+            table.append(BLOCK.pack(f.tell(), len(block)))
+            f.write(block)
+        table_offset = f.tell()
+        f.write(b"".join(table))
+        index_offset = f.tell()
+        f.write(b"".join(index))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, PACK_VERSION, 0, len(index), len(blocks),
+                            table_offset, index_offset, int(time.time())))
+    os.replace(tmp, path)
+    return len(index)
+
+class CachePack:
+    """A read-only, memory-mapped cache pack (see write_pack)."""
+
+    def __init__(self, path, cached_blocks=8):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.version, _, self.count, self.block_count, self._table, self._index, self.created = \
+                HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is not a cache pack")
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a cache pack")
+        if self.version > PACK_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is pack version {self.version}; this build reads up to {PACK_VERSION}")
+
+        self.cached_blocks = cached_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key_at(self, i):
+        start = self._index + i * INDEX.size
+        return self._map[start:start + KEY_BYTES]
+
+    def _block(self, number):
+        with self._lock:
+            data = self._blocks.get(number)
+            if data is not None:
+                self._blocks.move_to_end(number)
+                return data
+        offset, length = BLOCK.unpack_from(self._map, self._table + number * BLOCK.size)
+        data = zlib.decompress(self._map[offset:offset + length])
+        with self._lock:
+            self._blocks[number] = data
+            while len(self._blocks) > self.cached_blocks:
+                self._blocks.popitem(last=False)
+        return data
+
+    def _entry(self, i):
+        _, block, offset, length = INDEX.unpack_from(self._map, self._index + i * INDEX.size)
+        payload = self._block(block)[offset:offset + length]
+        created, hits, norm_len, scope_len = PAYLOAD.unpack_from(payload, 0)
+        start = PAYLOAD.size
+        norm = payload[start:start + norm_len].decode('utf-8')
+        scope = payload[start + norm_len:start + norm_len + scope_len].decode('utf-8')
+        result = payload[start + norm_len + scope_len:].decode('utf-8')
+        return norm, scope, result, created, hits
+
+    def get(self, digest, norm, scope):
+        """Translation for a normalized text and scope, or None."""
+        key = pack_key(digest)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Keys are digest prefixes: confirm the text, and step over any collision
+        while lo < self.count and self._key_at(lo) == key:
+            entry_norm, entry_scope, result, _, _ = self._entry(lo)
+            if entry_norm == norm and entry_scope == scope:
+                return result
+            lo += 1
+        return None
+
+    def __iter__(self):
+        """Yields (norm, scope, result, created, hit_count) in index order."""
+        for i in range(self.count):
+            yield self._entry(i)
+
+    def info(self):
+        return (f"{self.path}: pack v{self.version}, {self.count} entries in {self.block_count} blocks, "
+                f"{os.path.getsize(self.path) / 1024:.0f} KiB, "
+                f"created {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.created))}")
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,310 @@
+
+import os
+import queue
+import shlex
+import base64
+import threading
+import subprocess
+
+# Extra MIME type offered by serve_once wl-copy: listing the offered types shows
+# that it owns the clipboard without using up its single paste
+SERVE_ONCE_TYPE = "text/x-rp-translator"
+
+class SubprocessBackend:
+    """Forks wl-copy/wl-paste, xclip or xsel for every operation."""
+    name = "subprocess"
+
+    def __init__(self, wayland, wl_copy=None, wl_paste=None, xclip=None, xsel=None):
+        self.wayland = wayland
+        self.wl_copy = wl_copy
+        self.wl_paste = wl_paste
+        self.xclip = xclip
+        self.xsel = xsel
+
+    def available(self):
+        if self.wayland:
+            return bool(self.wl_copy and self.wl_paste)
+        return bool(self.xclip or self.xsel)
+
+    def read(self):
+        if self.wayland and self.wl_paste:
+            return subprocess.check_output(
+                [self.wl_paste], text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        elif self.xclip:
+            return subprocess.check_output(
+                [self.xclip, "-selection", "clipboard", "-o"],
+                text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        elif self.xsel:
+            return subprocess.check_output(
+                [self.xsel, "--clipboard", "--output"],
+                text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        raise RuntimeError("no clipboard tool available")
+
+    def read_primary(self):
+        if self.wayland and self.wl_paste:
+            return subprocess.check_output(
+                [self.wl_paste, "--primary"], text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        elif self.xclip:
+            return subprocess.check_output(
+                [self.xclip, "-selection", "primary", "-o"],
+                text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        elif self.xsel:
+            return subprocess.check_output(
+                [self.xsel, "--primary", "--output"],
+                text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        raise RuntimeError("no clipboard tool available")
+
+    def serving(self):
+        """
+        Non-consuming check that a serve_once write owns the clipboard, or None
+        if there is none (the write then serves one extra read for the check).
+        """
+        if not (self.wayland and self.wl_copy and self.wl_paste):
+            return None
+
+        def check():
+            types = subprocess.check_output(
+                [self.wl_paste, "--list-types"], text=True, stderr=subprocess.DEVNULL
+            )
+            return SERVE_ONCE_TYPE in types.split()
+        return check
+
+    def write(self, text, serve_once=False):
+        if serve_once and self.wayland and self.wl_copy:
+            # A text type, so the usual plain text types are offered alongside it
+            p = subprocess.Popen(
+                [self.wl_copy, "--foreground", "--paste-once", "--type", SERVE_ONCE_TYPE],
+                stdin=subprocess.PIPE
+            )
+            p.stdin.write(text.encode('utf-8'))
+            p.stdin.close()
+            return p
+        elif serve_once and not self.wayland and self.xclip:
+            # Two requests: the read that confirms ownership, then the paste
+            p = subprocess.Popen(
+                [self.xclip, "-selection", "clipboard", "-i", "-loops", "2", "-quiet"],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL
+            )
+            p.stdin.write(text.encode('utf-8'))
+            p.stdin.close()
+            return p
+        elif self.wayland and self.wl_copy:
+            p = subprocess.Popen([self.wl_copy], stdin=subprocess.PIPE)
+            p.communicate(input=text.encode('utf-8'))
+        elif self.xclip:
+            p = subprocess.Popen(
+                [self.xclip, "-selection", "clipboard", "-i"],
+                stdin=subprocess.PIPE
+            )
+            p.communicate(input=text.encode('utf-8'))
+        elif self.xsel:
+            p = subprocess.Popen(
+                [self.xsel, "--clipboard", "--input"],
+                stdin=subprocess.PIPE
+            )
+            p.communicate(input=text.encode('utf-8'))
+        else:
+            raise RuntimeError("no clipboard tool available")
+        return None
+
+    def close(self):
+        pass
+
+class WaylandWatchBackend:
+    """
+    Keeps one `wl-paste --watch` process alive and mirrors the clipboard in
+    memory, so reads never fork. Writes still go through wl-copy.
+    """
+    name = "wl-watch"
+
+    def __init__(self, wl_copy, wl_paste):
+        self.wl_copy = wl_copy
+        self._text = ""
+        self._cond = threading.Condition()
+        # One base64 line per clipboard change keeps multi-line text framed
+        self._proc = subprocess.Popen(
+            [wl_paste, "--type", "text", "--watch", "sh", "-c", "base64 -w0; echo"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        for line in self._proc.stdout:
+            try:
+                text = base64.b64decode(line.strip()).decode('utf-8', errors='replace').strip()
+            except ValueError:
+                continue
+            with self._cond:
+                self._text = text
+                self._cond.notify_all()
+
+    def read(self):
+        if self._proc.poll() is not None:
+            raise RuntimeError("wl-paste watcher exited")
+        with self._cond:
+            return self._text
+
+    def write(self, text, serve_once=False):
+        p = subprocess.Popen([self.wl_copy], stdin=subprocess.PIPE)
+        p.communicate(input=text.encode('utf-8'))
+        with self._cond:
+            self._text = text.strip()
+        return None
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.terminate()
+
+class TkBackend:
+    """
+    One persistent Tk root on its own thread, talking to the X server in-process.
+    Requests are handed over through a pipe registered as a Tk file handler.
+    """
+    name = "tk"
+
+    def __init__(self, timeout=2.0):
+        self.timeout = timeout
+        self._requests = queue.Queue()
+        self._wake_r, self._wake_w = os.pipe()
+        self._ready = threading.Event()
+        self._error = None
+        self._root = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None or self._root is None:
+            raise RuntimeError(f"Tk clipboard unavailable: {self._error}")
+
+    def _run(self):
+        try:
+            import tkinter as tk
+            self._root = tk.Tk()
+            self._root.withdraw()
+            self._root.createfilehandler(self._wake_r, tk.READABLE, self._serve)
+        except Exception as e:
+            self._error = e
+            self._root = None
+            self._ready.set()
+            return
+        self._ready.set()
+        # The event loop must keep running so other apps can read what we own
+        self._root.mainloop()
+
+    def _serve(self, fd, mask):
+        os.read(self._wake_r, 4096)
+        while True:
+            try:
+                fn, box = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                box["result"] = fn()
+            except Exception as e:
+                box["error"] = e
+            box["done"].set()
+
+    def _call(self, fn):
+        box = {"done": threading.Event(), "result": None, "error": None}
+        self._requests.put((fn, box))
+        os.write(self._wake_w, b"x")
+        if not box["done"].wait(self.timeout):
+            raise TimeoutError("Tk clipboard request timed out")
+        if box["error"] is not None:
+            raise box["error"]
+        return box["result"]
+
+    def read(self):
+        def do_read():
+            import tkinter as tk
+            try:
+                return self._root.clipboard_get()
+            except tk.TclError:
+                # Raised when the clipboard is empty or holds no text
+                return ""
+        return self._call(do_read).strip()
+
+    def read_primary(self):
+        def do_read():
+            import tkinter as tk
+            try:
+                return self._root.selection_get(selection="PRIMARY")
+            except tk.TclError:
+                return ""
+        return self._call(do_read).strip()
+
+    def write(self, text, serve_once=False):
+        def do_write():
+            self._root.clipboard_clear()
+            self._root.clipboard_append(text)
+            self._root.update()
+        self._call(do_write)
+        return None
+
+    def close(self):
+        try:
+            self._call(self._root.quit)
+        except Exception:
+            pass
+
+class HelperBackend:
+    """
+    Talks to a long-lived helper process over stdin/stdout.
+    Protocol: "GET\\n" -> "OK <n>\\n<n bytes>"; "SET <n>\\n<n bytes>" -> "OK 0\\n".
+    The helper is restarted once if it dies.
+    """
+    name = "helper"
+
+    def __init__(self, command):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self._proc = None
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _request(self, header, payload=b""):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._proc is None or self._proc.poll() is not None:
+                        self._start()
+                    self._proc.stdin.write(header + payload)
+                    self._proc.stdin.flush()
+                    status = self._proc.stdout.readline().split()
+                    if len(status) != 2 or status[0] != b"OK":
+                        raise OSError(f"bad clipboard helper reply: {status!r}")
+                    return self._proc.stdout.read(int(status[1]))
+                except (OSError, ValueError):
+                    self._proc = None
+                    if attempt:
+                        raise
+
+    def read(self):
+        return self._request(b"GET\n").decode('utf-8', errors='replace').strip()
+
+    def write(self, text, serve_once=False):
+        data = text.encode('utf-8')
+        self._request(f"SET {len(data)}\n".encode(), data)
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._proc and self._proc.poll() is None:
+                try:
+                    self._proc.stdin.write(b"QUIT\n")
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=1.0)
+                except Exception:
+                    self._proc.kill()
+            self._proc = None
@@ -1,10 +1,29 @@
 
 import os
+import time
 import subprocess
 import shutil
+from collections import deque
+from src.clipboard_backends import SubprocessBackend, WaylandWatchBackend, TkBackend, HelperBackend
+from src.metrics import metrics
 
 class ClipboardHandler:
-    def __init__(self):
+    def __init__(self, config=None):
+        settings = (config or {}).get("clipboard", {})
+        # Adaptive copy/paste synchronisation (seconds)
+        self.copy_timeout = float(settings.get("copy_timeout", 0.5))
+        self.set_timeout = float(settings.get("set_timeout", 0.3))
+        self.paste_timeout = float(settings.get("paste_timeout", 1.0))
+        self.poll_interval = float(settings.get("poll_interval", 0.005))
+        self.max_poll_interval = float(settings.get("max_poll_interval", 0.05))
+        # Replace the clipboard with a marker before copying, so a copy that never
+        # lands is told apart from re-copying the text the clipboard already held:
+        # "auto" does so only when the old content is someone else's text
+        sentinel = settings.get("sentinel", "auto")
+        self.sentinel = "auto" if str(sentinel).lower() == "auto" else bool(sentinel)
+        # Serve the translation to exactly one paste and wait for it (subprocess backend only)
+        self.confirm_paste = bool(settings.get("confirm_paste", False))
+
         self.session_type = os.environ.get("XDG_SESSION_TYPE", "x11").lower()
         self.wayland = "wayland" in self.session_type
         
@@ -21,57 +40,209 @@ class ClipboardHandler:
             if not self.xclip and not self.xsel:
                 print("Warning: X11 detected but xclip/xsel not found. Clipboard may fail.")
 
+        # The per-call tools are always kept as the fallback path
+        self.fallback = SubprocessBackend(
+            self.wayland, self.wl_copy, self.wl_paste, self.xclip, self.xsel
+        )
+        self.backend = self._select_backend(
+            str(settings.get("backend", "auto")).lower(),
+            settings.get("helper_command")
+        )
+        print(f"Clipboard backend: {self.backend.name}")
+        # Last text we put on the clipboard, so watchers can ignore our own writes
+        self.last_written = ""
+        # Texts already copied or prefetched: an unchanged clipboard holding
+        # one of them is the same selection pressed again, not an empty one
+        self.recent = deque(maxlen=32)
+
+    def _select_backend(self, choice, helper_command):
+        """Picks a persistent backend when one is usable, else the subprocess tools."""
+        if choice == "auto":
+            if helper_command:
+                candidates = ["helper"]
+            elif self.wayland and self.wl_copy and self.wl_paste:
+                candidates = ["wl-watch"]
+            elif not self.wayland and os.environ.get("DISPLAY"):
+                candidates = ["tk"]
+            else:
+                candidates = []
+        else:
+            candidates = [choice]
+
+        for name in candidates:
+            try:
+                if name == "helper":
+                    if not helper_command:
+                        raise ValueError("clipboard.helper_command is not set")
+                    return HelperBackend(helper_command)
+                if name == "wl-watch":
+                    return WaylandWatchBackend(self.wl_copy, self.wl_paste)
+                if name == "tk":
+                    return TkBackend()
+                if name == "subprocess":
+                    return self.fallback
+                print(f"Warning: Unknown clipboard backend '{name}'.")
+            except Exception as e:
+                print(f"Warning: Clipboard backend '{name}' unavailable ({e}).")
+
+        if not self.fallback.available():
+            # Last resort: in-process Tk, even without a detected display
+            try:
+                return TkBackend()
+            except Exception:
+                pass
+        return self.fallback
+
+    def _call_backend(self, method, *args):
+        """Runs a backend operation, switching to the subprocess tools if it fails."""
+        with metrics.span(f"clipboard.{method}", self.backend.name):
+            try:
+                return getattr(self.backend, method)(*args)
+            except Exception as e:
+                if self.backend is self.fallback:
+                    raise
+                print(f"Clipboard backend '{self.backend.name}' failed ({e}); using {self.fallback.name}.")
+                self.backend.close()
+                self.backend = self.fallback
+                return getattr(self.backend, method)(*args)
+
+    def _read(self):
+        """Reads the clipboard, raising on failure."""
+        return self._call_backend("read")
+
     def get_text(self):
         """Reads text from the primary clipboard."""
         try:
-            if self.wayland and self.wl_paste:
-                return subprocess.check_output([self.wl_paste], text=True).strip()
-            elif self.xclip:
-                return subprocess.check_output(
-                    [self.xclip, "-selection", "clipboard", "-o"], 
-                    text=True, stderr=subprocess.DEVNULL
-                ).strip()
-            elif self.xsel:
-                return subprocess.check_output(
-                    [self.xsel, "--clipboard", "--output"], 
-                    text=True, stderr=subprocess.DEVNULL
-                ).strip()
-            else:
-                # Fallback to pure python solution if binary missing (might be flaky on Linux)
-                import tkinter as tk
-                root = tk.Tk()
-                root.withdraw()
-                return root.clipboard_get()
+            return self._read()
         except Exception as e:
             print(f"Clipboard read error: {e}")
             return ""
 
-    def set_text(self, text):
-        """Writes text to the primary clipboard."""
+    def peek(self, selection="clipboard"):
+        """Quietly reads the clipboard or the primary selection; "" on any failure."""
         try:
-            if self.wayland and self.wl_copy:
-                p = subprocess.Popen([self.wl_copy], stdin=subprocess.PIPE)
-                p.communicate(input=text.encode('utf-8'))
-            elif self.xclip:
-                p = subprocess.Popen(
-                    [self.xclip, "-selection", "clipboard", "-i"], 
-                    stdin=subprocess.PIPE
-                )
-                p.communicate(input=text.encode('utf-8'))
-            elif self.xsel:
-                p = subprocess.Popen(
-                    [self.xsel, "--clipboard", "--input"], 
-                    stdin=subprocess.PIPE
-                )
-                p.communicate(input=text.encode('utf-8'))
-            else:
-                # Fallback
-                import tkinter as tk
-                root = tk.Tk()
-                root.withdraw()
-                root.clipboard_clear()
-                root.clipboard_append(text)
-                root.update()
-                root.destroy()
+            if selection == "primary":
+                reader = getattr(self.backend, "read_primary", None) or self.fallback.read_primary
+                return reader()
+            return self._read()
+        except Exception:
+            return ""
+
+    def is_own(self, text):
+        """True for content this tool wrote itself (translations, copy markers)."""
+        return text == self.last_written.strip() or text.startswith("__rp_translator_")
+
+    def _poll(self, done, timeout, read=None):
+        """Re-reads the clipboard (or calls read) with exponential backoff until done(text) or timeout."""
+        deadline = time.monotonic() + timeout
+        delay = self.poll_interval
+        while True:
+            try:
+                text = read() if read else self._read()
+            except Exception:
+                # An empty clipboard makes some tools exit non-zero
+                text = ""
+            if done(text):
+                return text, True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return text, False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.max_poll_interval)
+
+    def remember(self, text):
+        """Notes text the user copied or that was prefetched (see wait_for_copy)."""
+        text = text.strip()
+        if text and text not in self.recent:
+            self.recent.append(text)
+
+    def _write_quietly(self, text):
+        """Writes text that is not ours to keep (markers, restored content): last_written is left alone."""
+        try:
+            self._call_backend("write", text, False)
+        except Exception as e:
+            print(f"Clipboard write error: {e}")
+
+    def mark(self):
+        """
+        Fingerprints the clipboard before a copy; pass the result to wait_for_copy.
+        Content someone else put there is swapped for a marker first (with
+        sentinel "auto"), since a re-copy of it would not change the clipboard.
+        """
+        try:
+            current = self._read()
+        except Exception:
+            current = ""
+        ambiguous = bool(current) and not self.is_own(current)
+        if self.sentinel is True or (self.sentinel == "auto" and ambiguous):
+            marker = f"__rp_translator_{time.monotonic_ns()}__"
+            self._write_quietly(marker)
+            self.wait_until_set(marker)
+            return marker, current
+        return current, None
+
+    def wait_for_copy(self, fingerprint):
+        """
+        Waits for a simulated copy to replace the fingerprinted content.
+        Returns the copied text. If nothing was copied, returns the old content
+        when it was already copied or prefetched (the same selection pressed
+        again), else "".
+        """
+        before, replaced = fingerprint
+        text, changed = self._poll(lambda current: bool(current) and current != before, self.copy_timeout)
+        if changed:
+            self.remember(text)
+            return text
+
+        previous = before
+        if replaced is not None:
+            # Give the user their clipboard back instead of the marker
+            self._write_quietly(replaced)
+            previous = replaced
+        if previous and previous in self.recent:
+            return previous
+        print("Clipboard unchanged after copy; nothing selected.")
+        return ""
+
+    def wait_until_set(self, text, handle=None):
+        """
+        Waits until the clipboard serves text, i.e. our write has taken ownership.
+        For a serve_once handle the check must not use up its one paste: the
+        backend checks ownership without reading where it can, and otherwise
+        started the helper with a serve to spare for this read.
+        """
+        if handle is not None:
+            if handle.poll() is not None:
+                return False
+            serving = getattr(self.backend, "serving", lambda: None)()
+            if serving is not None:
+                return self._poll(bool, self.set_timeout, serving)[1]
+        return self._poll(lambda current: current == text.strip(), self.set_timeout)[1]
+
+    def wait_for_paste(self, handle):
+        """Waits for a serve_once set_text handle to hand its content to a paste."""
+        if handle is None:
+            return False
+        try:
+            handle.wait(timeout=self.paste_timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            # Nobody pasted (yet); stop serving so the helper doesn't linger
+            handle.kill()
+            return False
+
+    def set_text(self, text, serve_once=False):
+        """
+        Writes text to the primary clipboard.
+        With serve_once (wl-copy/xclip), the helper serves exactly one paste and its
+        process is returned for wait_for_paste; otherwise returns None.
+        """
+        self.last_written = text
+        try:
+            return self._call_backend("write", text, serve_once)
         except Exception as e:
             print(f"Clipboard write error: {e}")
+        return None
+
+    def close(self):
+        self.backend.close()
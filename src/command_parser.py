@@ -0,0 +1,43 @@
+
+# RP commands are always translated in strict English (see prompt.txt)
+ACTION_COMMANDS = ["/me", "/lme"]
+DESCRIPTION_COMMANDS = ["/do", "/ldo"]
+RP_COMMANDS = ACTION_COMMANDS + DESCRIPTION_COMMANDS
+
+ACTION_CONTEXT = "ACTION (User is performing an action. Use 3rd person present tense, e.g. 'runs', 'points')."
+DESCRIPTION_CONTEXT = "DESCRIPTION (User is describing the environment/state. Use descriptive/passive English)."
+DIALOGUE_CONTEXT = "DIALOGUE"
+
+def parse_command(original_text):
+    """
+    Splits a leading slash command (e.g. /me, /do, /low, /Radio) off the text.
+    Returns (command_token, translatable_text, mode_context).
+    """
+    command_token = ""
+    translatable_text = original_text
+    mode_context = DIALOGUE_CONTEXT # Default mode
+
+    # Check if first token is a command (starts with / followed by letters)
+    first_space = original_text.find(" ")
+    if first_space != -1:
+        potential_cmd = original_text[:first_space]
+        if potential_cmd.startswith("/") and len(potential_cmd) > 1 and potential_cmd[1].isalpha():
+            command_token = potential_cmd
+            translatable_text = original_text[first_space+1:].strip()
+
+            # Determine Context for AI (Strictly Rules)
+            slash_cmd = command_token.lower()
+            if slash_cmd in ACTION_COMMANDS:
+                mode_context = ACTION_CONTEXT
+            elif slash_cmd in DESCRIPTION_COMMANDS:
+                mode_context = DESCRIPTION_CONTEXT
+            else:
+                mode_context = f"DIALOGUE (User is speaking with command {command_token})."
+
+    return command_token, translatable_text, mode_context
+
+def effective_style(command_token, style):
+    """RP commands must ALWAYS be strict; everything else uses the configured style."""
+    if command_token.lower() in RP_COMMANDS:
+        return "strict"
+    return style
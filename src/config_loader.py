@@ -8,13 +8,174 @@ DEFAULT_CONFIG = {
     "openai": {
         "api_key": "",
         "model": "gpt-4o-mini",
-        "base_url": "https://api.openai.com/v1"
+        "base_url": "https://api.openai.com/v1",
+        # HTTP transport (seconds). http2 needs: pip install httpx[http2]
+        "connect_timeout": 3.0,
+        "read_timeout": 10.0,
+        "write_timeout": 5.0,
+        "pool_timeout": 2.0,
+        "max_connections": 4,
+        "keepalive_expiry": 300,
+        "http2": False,
+        # Open the connection at startup, and ping it when idle this long (0 = never)
+        "warmup": True,
+        "keepalive_interval": 60,
+        # Extra endpoints to race against, e.g. [{"base_url": ..., "model": ..., "api_key": ...}].
+        # Empty = just the base_url/model above. Missing keys fall back to those values.
+        "endpoints": [],
+        # Send the request to the next endpoint if the first hasn't answered within
+        # its p90 latency (clamped to min/max; max until enough samples are in)
+        "hedge": True,
+        "hedge_percentile": 90,
+        "hedge_min_delay": 0.3,
+        "hedge_max_delay": 3.0,
+        "hedge_min_samples": 10,
+        # Consecutive errors before an endpoint is moved to the back of the list
+        "max_failures": 3,
+        # Several independent lines per request (segments, batch CLI): reply format
+        # "numbered" or "json", and per-request limits (tokens are estimated as chars/4)
+        "batch_format": "numbered",
+        "batch_max_lines": 20,
+        "batch_max_tokens": 1500
     },
     "hotkey": "KEY_F9",
+    # Extra hotkeys, each translating with its own style, e.g. {"KEY_F10": "casual"}
+    "hotkeys": {},
     "style": "strict",
     "cache": {
         "enabled": True,
-        "db_path": "rp_translator.db"
+        "db_path": "rp_translator.db",
+        # In-process LRU in front of SQLite (0 entries disables it)
+        "memory_entries": 2048,
+        "memory_mb": 4,
+        # Write-behind: batch cache/log writes on a background thread.
+        # A crash loses at most one flush_interval (seconds) of writes.
+        "write_behind": True,
+        "flush_interval": 0.5,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # Retention (0 disables a limit). eviction: "lru" or "lfu"
+        "ttl_days": 90,
+        "max_rows": 50000,
+        "max_mb": 32,
+        "eviction": "lru",
+        "max_log_rows": 20000,
+        "max_metric_rows": 100000,
+        # Shared cache packs (main.py pack export), searched after the local cache
+        "packs": [],
+        # Seconds between retention passes, in both write modes
+        "maintenance_interval": 600,
+        # Cache and translate long text sentence by sentence, batching the misses
+        "segment_mode": False,
+        # Also match on a normalized key (whitespace, sentence-initial case, trailing .!?)
+        "normalize": True,
+        # Near-duplicate lookup on character trigrams; 0 disables, e.g. 0.9 to enable
+        "fuzzy_threshold": 0,
+        "fuzzy_max_entries": 20000,
+        "fuzzy_min_chars": 12
+    },
+    "clipboard": {
+        # "auto", "subprocess", "wl-watch" (Wayland), "tk" (X11) or "helper"
+        "backend": "auto",
+        # Long-lived helper speaking the HelperBackend protocol, used when set
+        "helper_command": "",
+        # Copy/paste synchronisation: poll with backoff instead of fixed sleeps (seconds)
+        "copy_timeout": 0.5,
+        "set_timeout": 0.3,
+        "poll_interval": 0.005,
+        "max_poll_interval": 0.05,
+        "key_hold": 0.02,
+        # Overwrite the clipboard with a marker before copying to detect empty selections:
+        # "auto" when it holds someone else's text (a re-copy wouldn't change it), true, false
+        "sentinel": "auto",
+        # Serve the translation to a single paste and wait for it (wl-copy/xclip)
+        "confirm_paste": False,
+        "paste_timeout": 1.0
+    },
+    "output": {
+        # "paste" the finished translation, or stream it in: "type" (via uinput, US layout)
+        # or "chunked" (paste sentence by sentence)
+        "mode": "paste",
+        "type_delay": 0.002
+    },
+    "prefetch": {
+        # Translate new clipboard content in the background before the hotkey is pressed
+        "enabled": False,
+        "selection": "clipboard",   # "clipboard", "primary" or "both"
+        "poll_interval": 0.25,
+        "settle": 0.4,
+        "min_chars": 8,
+        "max_chars": 400,
+        "min_interval": 2.0,
+        # Estimated tokens per rolling hour (0 = unlimited)
+        "token_budget": 20000
+    },
+    "scheduler": {
+        # Worker threads for hotkey presses, merge window (seconds) and queue depth
+        "workers": 2,
+        "debounce": 0.3,
+        "max_pending": 1
+    },
+    "routing": {
+        # First match wins. Match on "mode" (ACTION / DESCRIPTION / DIALOGUE), "style",
+        # "min_chars" / "max_chars"; set "model" (default: openai.model) and optionally
+        # override the output cap keys below. A catch-all route is added if missing.
+        "routes": [
+            {"name": "short-dialogue", "mode": "DIALOGUE", "max_chars": 80},
+            {"name": "default"}
+        ],
+        # Output cap = estimated input tokens * ratio + base, at most max_tokens (ratio 0 = no cap)
+        "max_tokens_ratio": 2.0,
+        "max_tokens_base": 32,
+        "max_tokens": 1024
+    },
+    "rate_limit": {
+        # Client-side limits (0 = unlimited); set them a little under your account's limits
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+        # 429s (honouring Retry-After), timeouts, connection and 5xx errors are retried
+        # with jittered exponential backoff, within a deadline per priority (seconds)
+        "max_retries": 4,
+        "backoff_base": 0.5,
+        "backoff_max": 20.0,
+        "interactive_deadline": 8.0,
+        "background_deadline": 120.0,
+        # Prefetch/batch requests beyond this many waiting are rejected
+        "max_background_queue": 16
+    },
+    "batch": {
+        # Concurrent translations in translate_batch.py
+        "workers": 4
+    },
+    "metrics": {
+        # Per-stage latency samples (copy, cache lookup, queue wait, completion, paste...)
+        "enabled": False,
+        # Samples per stage kept for the rolling p50/p95/p99
+        "window": 1000,
+        # Prometheus text file for node_exporter's textfile collector ("" = off)
+        "textfile": "",
+        # Seconds between writes to the database and the text file
+        "flush_interval": 15
+    },
+    "phrase_table": {
+        # Translate lines fully covered by phrases compiled from the log
+        # (`main.py phrases compile`) without calling the API
+        "enabled": True,
+        # A phrase needs this many logged translations, and its most common
+        # translation must make up at least this share of them
+        "min_count": 3,
+        "min_confidence": 0.8,
+        # Styles that always go to the API
+        "disabled_styles": []
+    },
+    "startup": {
+        # Arm the hotkey first and build the translator in the background;
+        # false builds everything before listening, as older versions did
+        "deferred": True,
+        # How long a press made during start-up waits for the translator (seconds)
+        "ready_timeout": 30,
+        # How long shutdown waits for a press that is still running (seconds)
+        "shutdown_timeout": 10
     },
     "prompt_file": "prompt.txt"
 }
@@ -0,0 +1,185 @@
+
+import time
+import queue
+import threading
+from collections import deque
+
+class RequestCancelled(Exception):
+    """Raised inside a hedged call that lost the race."""
+
+class Endpoint:
+    """One base_url + model pair, with its own client and latency history."""
+
+    def __init__(self, name, client, model, window=100):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.latencies = deque(maxlen=window)
+        self.failures = 0   # consecutive
+        self.stats = {"requests": 0, "errors": 0, "wins": 0, "cancelled": 0}
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+            self.failures = 0
+
+    def record_lower_bound(self, elapsed):
+        """A call that lost a hedge after elapsed seconds: it would have taken at least that long."""
+        with self._lock:
+            self.latencies.append(elapsed)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.stats["errors"] += 1
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+class EndpointPool:
+    """
+    Runs a request against the best endpoint and, if it has not answered
+    within that endpoint's p90 latency, sends the same request to the next
+    one. The first success wins; the other call is told to stop.
+    Healthy endpoints are tried fastest first (by p50, once measured);
+    endpoints with max_failures consecutive errors move to the back.
+    """
+
+    def __init__(self, endpoints, config):
+        self.endpoints = list(endpoints)
+        self.hedge = bool(config.get("hedge", True))
+        self.hedge_percentile = float(config.get("hedge_percentile", 90))
+        self.hedge_min_delay = float(config.get("hedge_min_delay", 0.3))
+        self.hedge_max_delay = float(config.get("hedge_max_delay", 3.0))
+        self.hedge_min_samples = int(config.get("hedge_min_samples", 10))
+        self.max_failures = int(config.get("max_failures", 3))
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def _estimate(self, endpoint):
+        # Unmeasured endpoints keep their config order behind measured ones
+        if len(endpoint.latencies) < self.hedge_min_samples:
+            return float("inf")
+        return endpoint.percentile(50)
+
+    def ordered(self):
+        """Healthy endpoints first, fastest p50 first; repeatedly failing ones last."""
+        return sorted(self.endpoints, key=lambda ep: (ep.failures >= self.max_failures, self._estimate(ep)))
+
+    def primary(self):
+        return self.ordered()[0] if self.endpoints else None
+
+    def hedge_delay(self, endpoint):
+        # Until there is enough history, wait the maximum before hedging
+        if len(endpoint.latencies) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        delay = endpoint.percentile(self.hedge_percentile)
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    def _run(self, endpoint, fn, cancel):
+        endpoint.stats["requests"] += 1
+        started = time.perf_counter()
+        try:
+            result = fn(endpoint, cancel)
+        except RequestCancelled:
+            endpoint.stats["cancelled"] += 1
+            raise
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return result
+
+    def call(self, fn):
+        """
+        fn(endpoint, cancel) performs one request; it should check the
+        cancel Event while reading and raise RequestCancelled once it is set.
+        Returns the first successful result, or raises the last error.
+        """
+        if not self.endpoints:
+            raise RuntimeError("No OpenAI endpoints configured")
+        self.stats["calls"] += 1
+        order = self.ordered()
+        if not self.hedge or len(order) < 2:
+            return self._run(order[0], fn, None)
+
+        results = queue.Queue()
+        cancels = []
+        launched = []   # (endpoint, start time), in launch order
+        finished = set()
+
+        def launch(endpoint):
+            cancel = threading.Event()
+            cancels.append(cancel)
+            launched.append((endpoint, time.perf_counter()))
+
+            def worker():
+                try:
+                    results.put((endpoint, None, self._run(endpoint, fn, cancel)))
+                except Exception as e:
+                    results.put((endpoint, e, None))
+            threading.Thread(target=worker, daemon=True).start()
+
+        primary, backup = order[0], order[1]
+        launch(primary)
+        outstanding = 1
+        try:
+            first = results.get(timeout=self.hedge_delay(primary))
+        except queue.Empty:
+            first = None
+            self.stats["hedged"] += 1
+            launch(backup)
+            outstanding += 1
+
+        last_error = None
+        while True:
+            if first is None:
+                first = results.get()
+            endpoint, error, result = first
+            first = None
+            outstanding -= 1
+            finished.add(endpoint)
+            if error is None:
+                endpoint.stats["wins"] += 1
+                if endpoint is not primary:
+                    self.stats["hedge_wins"] += 1
+                for cancel in cancels:
+                    cancel.set()
+                # A loser launched before the winner has already run longer than the
+                # winner took: record that as a lower bound, or a slow endpoint never
+                # gets samples. One launched later tells nothing about its speed.
+                now = time.perf_counter()
+                for loser, started in launched:
+                    if loser is endpoint:
+                        break
+                    if loser not in finished:
+                        loser.record_lower_bound(now - started)
+                return result
+
+            last_error = error
+            if len(cancels) < 2:
+                # Primary failed before the hedge delay: fail over right away
+                self.stats["failovers"] += 1
+                launch(backup)
+                outstanding += 1
+            elif outstanding == 0:
+                raise last_error
+
+    def report(self):
+        lines = [
+            f"Hedged {self.stats['hedged']}/{self.stats['calls']} calls "
+            f"(backup won {self.stats['hedge_wins']}, failovers {self.stats['failovers']})"
+        ]
+        for ep in self.endpoints:
+            p50, p90 = ep.percentile(50), ep.percentile(90)
+            latency = f"p50 {p50 * 1000:.0f} ms, p90 {p90 * 1000:.0f} ms" if p50 is not None else "no samples"
+            lines.append(
+                f"  {ep.name}: {ep.stats['requests']} requests, {ep.stats['wins']} wins, "
+                f"{ep.stats['errors']} errors, {ep.stats['cancelled']} cancelled, {latency}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,90 @@
+
+import threading
+from collections import OrderedDict
+
+class FuzzyIndex:
+    """
+    In-memory character n-gram index over normalized cache keys.
+    Finds the most similar cached text (Jaccard similarity of n-gram sets)
+    within the same style/mode scope.
+    """
+
+    def __init__(self, threshold=0.9, n=3, max_entries=20000, min_chars=12):
+        self.threshold = threshold
+        self.n = n
+        self.max_entries = max_entries
+        self.min_chars = min_chars
+        self._entries = OrderedDict()   # id -> (scope, text, grams, key)
+        self._postings = {}             # (scope, gram) -> set of ids
+        self._by_text = {}              # (scope, text) -> id
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _grams(self, text):
+        padded = f" {text.lower()} "
+        if len(padded) <= self.n:
+            return frozenset([padded])
+        return frozenset(padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+
+    def _remove(self, entry_id):
+        scope, text, grams, _ = self._entries.pop(entry_id)
+        self._by_text.pop((scope, text), None)
+        for gram in grams:
+            ids = self._postings.get((scope, gram))
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._postings[(scope, gram)]
+
+    def add(self, text, scope, key):
+        if len(text) < self.min_chars or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            old_id = self._by_text.get((scope, text))
+            if old_id is not None:
+                self._remove(old_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            grams = self._grams(text)
+            self._entries[entry_id] = (scope, text, grams, key)
+            self._by_text[(scope, text)] = entry_id
+            for gram in grams:
+                self._postings.setdefault((scope, gram), set()).add(entry_id)
+
+            # Oldest additions make room for new ones
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, text, scope):
+        """Forgets text, e.g. once its cache row has been evicted."""
+        with self._lock:
+            entry_id = self._by_text.get((scope, text))
+            if entry_id is not None:
+                self._remove(entry_id)
+
+    def find(self, text, scope):
+        """Returns (key, similarity) of the best match at or above the threshold, else None."""
+        if len(text) < self.min_chars:
+            return None
+
+        grams = self._grams(text)
+        size = len(grams)
+        with self._lock:
+            shared = {}
+            for gram in grams:
+                for entry_id in self._postings.get((scope, gram), ()):
+                    shared[entry_id] = shared.get(entry_id, 0) + 1
+
+            best = None
+            for entry_id, common in shared.items():
+                _, _, other_grams, key = self._entries[entry_id]
+                other = len(other_grams)
+                score = common / (size + other - common)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (key, score)
+            return best
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,131 @@
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class HotkeyScheduler:
+    """
+    Runs hotkey presses on a fixed-size worker pool. A press arriving within
+    the debounce window of the last accepted press of the same binding (same
+    args, e.g. style) is merged into it; at most max_pending presses wait.
+    """
+
+    def __init__(self, config, handler):
+        settings = config.get("scheduler", {})
+        self.handler = handler
+        self.workers = max(1, int(settings.get("workers", 2)))
+        self.debounce = float(settings.get("debounce", 0.3))
+        self.max_pending = max(0, int(settings.get("max_pending", 1)))
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hotkey")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # args -> monotonic time of its last accepted press
+        self._last_accepted = {}
+        self._active = 0
+        self._waiting = 0
+        self._closed = False
+        self.stats = {"presses": 0, "run": 0, "merged": 0, "dropped": 0}
+
+    def submit(self, *args):
+        """Called from the input thread for every hotkey press; never blocks."""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["presses"] += 1
+            if self._closed:
+                self.stats["dropped"] += 1
+                return
+
+            # Key mashing / bouncing: fold into the press of this hotkey that was
+            # just accepted; a different hotkey (style) is a separate request
+            if now - self._last_accepted.get(args, float("-inf")) < self.debounce:
+                self.stats["merged"] += 1
+                return
+
+            # Every worker busy and the queue full: the queued press already covers this one
+            if self._active >= self.workers and self._waiting >= self.max_pending:
+                self.stats["dropped"] += 1
+                print("Busy: hotkey press dropped.")
+                return
+
+            self._last_accepted[args] = now
+            self._waiting += 1
+
+        self.executor.submit(self._run, args)
+
+    def _run(self, args):
+        with self._lock:
+            self._waiting -= 1
+            if self._closed:
+                # Picked up just as shutdown() began: drop it like the queued ones
+                self.stats["dropped"] += 1
+                return
+            self._active += 1
+            self.stats["run"] += 1
+        try:
+            self.handler(*args)
+        except Exception as e:
+            print(f"Hotkey handler error: {e}")
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def shutdown(self, timeout=None):
+        """
+        Stops taking presses and drops queued ones, then waits up to timeout
+        seconds for running ones to finish. Returns False if one still runs.
+        """
+        with self._lock:
+            self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one in-flight call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn, context=None, on_join=None):
+        """
+        Runs fn(), or waits for the identical call already in flight.
+        context is kept with the leader's call; a caller joining it runs
+        on_join(context) first (e.g. to raise the call's priority).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None, "context": context}
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            if on_join is not None:
+                on_join(call["context"])
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
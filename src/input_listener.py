@@ -1,94 +1,290 @@
 
-import evdev
-from evdev import InputDevice, categorize, ecodes
-import threading
-import time
+import os
+import errno
+import ctypes
+import ctypes.util
 import select
-import sys
+import struct
+import threading
+from evdev import InputDevice, ecodes
+
+# inotify(7) event masks
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+INOTIFY_EVENT = struct.Struct("iIII")   # wd, mask, cookie, len (name follows)
+
+# Bits per word in the sysfs capability bitmaps (a C long)
+LONG_BITS = ctypes.sizeof(ctypes.c_long) * 8
+
+def open_inotify(path, mask):
+    """Non-blocking inotify fd watching path for mask; raises OSError if unavailable."""
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, f"cannot watch {path}: {os.strerror(err)}")
+    return fd
+
+def read_inotify(fd):
+    """Drains an inotify fd -> [(mask, name)]."""
+    changes = []
+    while True:
+        try:
+            data = os.read(fd, 4096)
+        except BlockingIOError:
+            return changes
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            changes.append((mask, name))
+
+def has_bit(bitmap, bit):
+    """Tests a bit in a sysfs bitmap ("1f 0 fffffffe ...", most significant word first)."""
+    words = bitmap.split()
+    index = len(words) - 1 - bit // LONG_BITS
+    return index >= 0 and bool(int(words[index], 16) >> (bit % LONG_BITS) & 1)
 
 class InputListener:
+    """
+    Waits for hotkeys on every keyboard that has them, in one epoll loop with
+    no timeouts. Keyboards are found through sysfs, so other devices are never
+    opened, and inotify on /dev/input attaches replugged or new keyboards and
+    drops removed ones. Each hotkey can carry its own translation style.
+    """
+    DEVICE_DIR = "/dev/input"
+    SYSFS_DIR = "/sys/class/input"
+
     def __init__(self, config, callback):
         self.hotkey_name = config.get("hotkey", "KEY_F9")
         self.callback = callback
-        self.devices = []
+        # key code -> style passed to the callback (None = the configured style)
+        self.hotkeys = self._parse_hotkeys(config)
+        self.devices = {}        # fd -> InputDevice
+        self.paths = {}          # device path -> fd
+        # Hotkeys supported per device identity, so replugs skip the scan
+        self._capabilities = {}
+        self._lock = threading.Lock()
+        self._epoll = None
+        self._inotify = None
+        self._wake_r = self._wake_w = None
         self.running = False
         self.thread = None
 
+    def _parse_hotkeys(self, config):
+        hotkeys = {}
+        self.bindings = []
+        bindings = [(self.hotkey_name, None)] + list((config.get("hotkeys") or {}).items())
+        for name, style in bindings:
+            code = ecodes.ecodes.get(name)
+            if code is None:
+                print(f"Error: Invalid hotkey name '{name}' in config.")
+                continue
+            hotkeys[code] = style or None
+            self.bindings.append(f"{name} ({style})" if style else name)
+        return hotkeys
+
+    def _sysfs(self, node, *parts):
+        path = os.path.join(self.SYSFS_DIR, node, "device", *parts)
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+
+    def _sysfs_hotkeys(self, node):
+        """
+        Hotkey codes the device behind /dev/input/<node> reports, read from sysfs
+        and cached by device identity. None if sysfs can't tell.
+        """
+        try:
+            identity = (
+                self._sysfs(node, "name"), self._sysfs(node, "phys"), self._sysfs(node, "uniq"),
+                *(self._sysfs(node, "id", field) for field in ("bustype", "vendor", "product", "version"))
+            )
+        except OSError:
+            return None
+        codes = self._capabilities.get(identity)
+        if codes is None:
+            try:
+                bitmap = self._sysfs(node, "capabilities", "key")
+            except OSError:
+                bitmap = ""
+            codes = frozenset(code for code in self.hotkeys if has_bit(bitmap, code))
+            self._capabilities[identity] = codes
+        return codes
+
+    def _probe(self, path):
+        """Opens path if it is a keyboard with one of our hotkeys, else returns None."""
+        codes = self._sysfs_hotkeys(os.path.basename(path))
+        if codes is not None and not codes:
+            return None
+
+        device = InputDevice(path)
+        if codes is None:
+            # No sysfs (containers, odd kernels): ask the device itself
+            keys = device.capabilities().get(ecodes.EV_KEY, [])
+            if not any(code in keys for code in self.hotkeys):
+                device.close()
+                return None
+        return device
+
     def find_all_keyboards(self):
-        """Finds all devices that look like keyboards and support the hotkey."""
+        """Finds all devices that look like keyboards and support a hotkey."""
         candidates = []
-        target_key = ecodes.ecodes.get(self.hotkey_name)
-        
-        if target_key is None:
-            print(f"Error: Invalid hotkey name '{self.hotkey_name}' in config.")
-            return []
-
         try:
-            paths = evdev.list_devices()
-            for path in paths:
-                try:
-                    dev = InputDevice(path)
-                    # Check if device supports EV_KEY
-                    cap_keys = dev.capabilities().get(ecodes.EV_KEY)
-                    if cap_keys:
-                        # Check if it supports our specific hotkey (smart filtering)
-                        if target_key in cap_keys:
-                            candidates.append(dev)
-                except Exception:
-                    continue
-        except Exception as e:
+            nodes = sorted(name for name in os.listdir(self.DEVICE_DIR) if name.startswith("event"))
+        except OSError as e:
             print(f"Error scanning devices: {e}")
-            
+            return candidates
+
+        for node in nodes:
+            try:
+                device = self._probe(os.path.join(self.DEVICE_DIR, node))
+            except OSError:
+                continue
+            if device is not None:
+                candidates.append(device)
         return candidates
 
+    def add_device(self, device):
+        """Starts listening on an opened device (ignored if its path is already watched)."""
+        with self._lock:
+            if device.path in self.paths:
+                device.close()
+                return
+            self.devices[device.fd] = device
+            self.paths[device.path] = device.fd
+            if self._epoll is not None:
+                self._epoll.register(device.fd, select.EPOLLIN)
+        print(f" - {device.name} ({device.path})")
+
+    def remove_device(self, fd, reason="removed"):
+        with self._lock:
+            device = self.devices.pop(fd, None)
+            if device is None:
+                return
+            self.paths.pop(device.path, None)
+            try:
+                self._epoll.unregister(fd)
+            except (OSError, ValueError):
+                pass
+        try:
+            device.close()
+        except Exception:
+            pass
+        print(f"Keyboard {reason}: {device.name} ({device.path})")
+
     def start(self):
-        self.devices = self.find_all_keyboards()
+        if not self.hotkeys:
+            print("Error: No valid hotkeys configured.")
+            return
+
+        self._epoll = select.epoll()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        try:
+            self._inotify = open_inotify(self.DEVICE_DIR, IN_CREATE | IN_ATTRIB | IN_DELETE)
+            self._epoll.register(self._inotify, select.EPOLLIN)
+        except (OSError, AttributeError) as e:
+            print(f"Warning: Keyboard hotplug disabled ({e}).")
+
+        print(f"Listening for {', '.join(self.bindings)} on:")
+        for device in self.find_all_keyboards():
+            self.add_device(device)
         if not self.devices:
-            print("Error: No keyboard devices found that support the configured hotkey.")
+            print("No keyboard devices found that support the configured hotkey yet.")
             print("Ensure you are running with sudo or have input group permissions.")
-            return
 
-        print(f"Listening for {self.hotkey_name} on {len(self.devices)} devices:")
-        for d in self.devices:
-            print(f" - {d.name} ({d.path})")
-        
         self.running = True
         self.thread = threading.Thread(target=self._loop, daemon=True)
         self.thread.start()
 
+    def _hotplug(self):
+        for mask, name in read_inotify(self._inotify):
+            if not name.startswith("event"):
+                continue
+            path = os.path.join(self.DEVICE_DIR, name)
+            if mask & IN_DELETE:
+                fd = self.paths.get(path)
+                if fd is not None:
+                    self.remove_device(fd, "unplugged")
+                continue
+            if path in self.paths:
+                continue
+            # New node, or udev has just given us access to one (IN_ATTRIB)
+            try:
+                device = self._probe(path)
+            except OSError as e:
+                if e.errno not in (errno.EACCES, errno.EPERM, errno.ENOENT):
+                    print(f"Could not open {path}: {e}")
+                continue
+            if device is not None:
+                print("Keyboard connected:")
+                self.add_device(device)
+
     def _loop(self):
-        target_key = ecodes.ecodes.get(self.hotkey_name)
-        
-        # Map file descriptors to devices for select
-        fd_to_dev = {dev.fd: dev for dev in self.devices}
-        
         try:
             while self.running:
-                # Wait for input on any of the devices
-                r, w, x = select.select(self.devices, [], [], 1.0)
-                
-                for dev in r:
+                # Blocks until input, a hotplug change or stop(): no polling timeout
+                for fd, mask in self._epoll.poll():
+                    if fd == self._wake_r:
+                        continue
+                    if fd == self._inotify:
+                        self._hotplug()
+                        continue
+
+                    device = self.devices.get(fd)
+                    if device is None:
+                        continue
                     try:
-                        for event in dev.read():
-                            if event.type == ecodes.EV_KEY:
-                                if event.value == 1:  # Key Down
-                                    if event.code == target_key:
-                                        # print(f"Hotkey detected on {dev.name}!")
-                                        # Run callback in separate thread to not block input loop
-                                        threading.Thread(target=self.callback).start()
-                    except OSError:
-                        # Device disconnected?
-                        pass
-                        
+                        events = device.read()
+                    except BlockingIOError:
+                        if mask & (select.EPOLLERR | select.EPOLLHUP):
+                            self.remove_device(fd, "disconnected")
+                        continue
+                    except OSError as e:
+                        # Unplugged: the node reports ENODEV until it is removed
+                        self.remove_device(fd, f"disconnected ({e.strerror or e})")
+                        continue
+
+                    for event in events:
+                        if event.type == ecodes.EV_KEY and event.value == 1 and event.code in self.hotkeys:
+                            # The callback must not block the input loop;
+                            # main() hands presses to a HotkeyScheduler
+                            self.callback(self.hotkeys[event.code])
         except Exception as e:
             print(f"Input listener loop error: {e}")
         finally:
             self.running = False
-            for d in self.devices:
+            self._close()
+
+    def _close(self):
+        with self._lock:
+            devices, self.devices, self.paths = list(self.devices.values()), {}, {}
+        for d in devices:
+            try:
+                d.close()
+            except Exception:
+                pass
+        fds = (self._inotify, self._wake_r, self._wake_w)
+        self._inotify = self._wake_r = self._wake_w = None
+        for fd in fds:
+            if fd is not None:
                 try:
-                    d.close()
-                except:
+                    os.close(fd)
+                except OSError:
                     pass
+        self._epoll.close()
 
     def stop(self):
         self.running = False
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                pass
@@ -0,0 +1,62 @@
+
+import time
+from evdev import ecodes as e
+
+# US keyboard layout: character -> (key, needs shift)
+_UNSHIFTED = {
+    "`": e.KEY_GRAVE, "-": e.KEY_MINUS, "=": e.KEY_EQUAL, "[": e.KEY_LEFTBRACE,
+    "]": e.KEY_RIGHTBRACE, "\\": e.KEY_BACKSLASH, ";": e.KEY_SEMICOLON,
+    "'": e.KEY_APOSTROPHE, ",": e.KEY_COMMA, ".": e.KEY_DOT, "/": e.KEY_SLASH,
+    " ": e.KEY_SPACE, "\t": e.KEY_TAB,
+}
+_SHIFTED = {
+    "~": e.KEY_GRAVE, "!": e.KEY_1, "@": e.KEY_2, "#": e.KEY_3, "$": e.KEY_4,
+    "%": e.KEY_5, "^": e.KEY_6, "&": e.KEY_7, "*": e.KEY_8, "(": e.KEY_9,
+    ")": e.KEY_0, "_": e.KEY_MINUS, "+": e.KEY_EQUAL, "{": e.KEY_LEFTBRACE,
+    "}": e.KEY_RIGHTBRACE, "|": e.KEY_BACKSLASH, ":": e.KEY_SEMICOLON,
+    "\"": e.KEY_APOSTROPHE, "<": e.KEY_COMMA, ">": e.KEY_DOT, "?": e.KEY_SLASH,
+}
+
+KEYMAP = {}
+for ch in "abcdefghijklmnopqrstuvwxyz":
+    KEYMAP[ch] = (getattr(e, f"KEY_{ch.upper()}"), False)
+    KEYMAP[ch.upper()] = (getattr(e, f"KEY_{ch.upper()}"), True)
+for ch in "1234567890":
+    KEYMAP[ch] = (getattr(e, f"KEY_{ch}"), False)
+for ch, key in _UNSHIFTED.items():
+    KEYMAP[ch] = (key, False)
+for ch, key in _SHIFTED.items():
+    KEYMAP[ch] = (key, True)
+
+class KeyTyper:
+    """Types text into the focused window through a UInput device (US layout)."""
+
+    def __init__(self, uinput, delay=0.002):
+        self.uinput = uinput
+        self.delay = delay
+
+    @staticmethod
+    def can_type(text):
+        return all(ch in KEYMAP for ch in text)
+
+    def _tap(self, key, shift=False):
+        if shift:
+            self.uinput.write(e.EV_KEY, e.KEY_LEFTSHIFT, 1)
+        self.uinput.write(e.EV_KEY, key, 1)
+        self.uinput.write(e.EV_KEY, key, 0)
+        if shift:
+            self.uinput.write(e.EV_KEY, e.KEY_LEFTSHIFT, 0)
+        self.uinput.syn()
+        if self.delay:
+            time.sleep(self.delay)
+
+    def type_text(self, text):
+        """Types every character of text; callers check can_type first."""
+        for ch in text:
+            key, shift = KEYMAP[ch]
+            self._tap(key, shift)
+
+    def backspace(self, count):
+        """Erases count characters, e.g. to undo partial output."""
+        for _ in range(count):
+            self._tap(e.KEY_BACKSPACE)
@@ -0,0 +1,197 @@
+
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = "samp_translator_stage_seconds"
+
+def label_value(value):
+    """A Prometheus label value: None as "", with backslash, quote and newline escaped."""
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def percentile(samples, q):
+    """q-quantile of an already sorted list."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+class _NullSpan:
+    """What span() hands out while metrics are off: does nothing at all."""
+    label = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """Times a with-block on the monotonic clock; label can be set inside it."""
+    __slots__ = ("metrics", "stage", "label", "started")
+
+    def __init__(self, metrics, stage, label):
+        self.metrics = metrics
+        self.stage = stage
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self.label:
+            self.label = "error"
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, self.label)
+        return False
+
+class Metrics:
+    """
+    Per-stage latency samples, labelled (e.g. by cache hit kind or backend),
+    with rolling p50/p95/p99. Samples can be written out as a Prometheus text
+    file and handed to a sink (the cache database) for `main.py metrics`.
+    Disabled by default; while off, span() and observe() return immediately.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.window = 1000
+        self.textfile = ""
+        self.flush_interval = 15.0
+        self.sink = None
+        self._series = {}     # (stage, label) -> [recent samples, count, sum]
+        self._pending = []    # (time, stage, label, seconds) not yet handed to the sink
+        self._lock = threading.Lock()
+        self._running = False
+
+    def configure(self, config):
+        settings = config.get("metrics", {})
+        self.enabled = bool(settings.get("enabled", False))
+        self.window = int(settings.get("window", 1000))
+        self.textfile = settings.get("textfile", "")
+        self.flush_interval = float(settings.get("flush_interval", 15))
+
+    def span(self, stage, label=""):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage, label)
+
+    def observe(self, stage, seconds, label=""):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._series.get((stage, label))
+            if series is None:
+                series = self._series[(stage, label)] = [deque(maxlen=self.window), 0, 0.0]
+            series[0].append(seconds)
+            series[1] += 1
+            series[2] += seconds
+            if self.sink is not None:
+                self._pending.append((time.time(), stage, label, seconds))
+
+    def reset(self):
+        """Drops every sample (e.g. between benchmark runs)."""
+        with self._lock:
+            self._series.clear()
+            self._pending = []
+
+    def snapshot(self):
+        """[(stage, label, count, sum, {quantile: seconds})] over the rolling window."""
+        with self._lock:
+            items = [(key, sorted(series[0]), series[1], series[2]) for key, series in self._series.items()]
+        return [
+            (stage, label, count, total, {q: percentile(samples, q) for q in QUANTILES})
+            for (stage, label), samples, count, total in sorted(items)
+        ]
+
+    def start(self):
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self.enabled:
+            self.flush()
+
+    def _flush_loop(self):
+        while self._running:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        try:
+            if pending and self.sink is not None:
+                self.sink(pending)
+            if self.textfile:
+                self.write_textfile(self.textfile)
+        except Exception as e:
+            print(f"Metrics export error: {e}")
+
+    def write_textfile(self, path):
+        """Prometheus text format, replaced atomically (node_exporter textfile style)."""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent per translator stage.",
+            f"# TYPE {METRIC_NAME} summary"
+        ]
+        for stage, label, count, total, quantiles in self.snapshot():
+            labels = f'stage="{label_value(stage)}",label="{label_value(label)}"'
+            for q, seconds in quantiles.items():
+                lines.append(f'{METRIC_NAME}{{{labels},quantile="{q}"}} {seconds:.6f}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+    def report(self):
+        return format_table(
+            (stage, label, count, quantiles) for stage, label, count, _, quantiles in self.snapshot()
+        )
+
+def format_table(rows):
+    lines = [f"{'stage':<24}{'label':<18}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+    for stage, label, count, quantiles in rows:
+        lines.append(
+            f"{stage:<24}{label or '-':<18}{count:>7}"
+            + "".join(f"{quantiles[q] * 1000:>9.1f}" for q in QUANTILES)
+        )
+    return "\n".join(lines)
+
+def summarize(db_path, hours=24):
+    """Latency table from the samples persisted in the cache database."""
+    if not os.path.exists(db_path):
+        return f"No database at {db_path}."
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT stage, label, seconds FROM stage_metrics WHERE at >= ? ORDER BY stage, label",
+            (time.time() - hours * 3600,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return "No metrics recorded yet (set metrics.enabled: true)."
+    finally:
+        conn.close()
+
+    series = {}
+    for stage, label, seconds in rows:
+        series.setdefault((stage, label), []).append(seconds)
+    if not series:
+        return f"No metrics in the last {hours:g} hours."
+    return format_table(
+        (stage, label, len(samples), {q: percentile(sorted(samples), q) for q in QUANTILES})
+        for (stage, label), samples in sorted(series.items())
+    )
+
+# Shared instance: components record into it, main.py configures and exports it
+metrics = Metrics()
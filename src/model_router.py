@@ -0,0 +1,112 @@
+
+import threading
+from collections import deque
+
+class Route:
+    """
+    One row of the routing table: which requests it matches (mode, style,
+    input length) and how they are sent (model, output token cap).
+    """
+
+    def __init__(self, settings, defaults):
+        self.name = settings.get("name") or "route"
+        self.model = settings.get("model")   # None = the endpoint's own model
+        self.modes = self._as_list(settings.get("mode"), upper=True)
+        self.styles = self._as_list(settings.get("style"))
+        self.min_chars = int(settings.get("min_chars", 0))
+        self.max_chars = settings.get("max_chars")
+        self.max_tokens_ratio = float(settings.get("max_tokens_ratio", defaults.get("max_tokens_ratio", 2.0)))
+        self.max_tokens_base = int(settings.get("max_tokens_base", defaults.get("max_tokens_base", 32)))
+        self.max_tokens = int(settings.get("max_tokens", defaults.get("max_tokens", 1024)))
+
+        self.latencies = deque(maxlen=200)
+        self.stats = {
+            "requests": 0, "errors": 0, "truncated": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _as_list(value, upper=False):
+        if not value:
+            return []
+        values = value if isinstance(value, list) else [value]
+        return [str(v).upper() if upper else str(v) for v in values]
+
+    def matches(self, text, mode_context, style):
+        if self.modes and not any(mode_context.upper().startswith(m) for m in self.modes):
+            return False
+        if self.styles and style not in self.styles:
+            return False
+        if len(text) < self.min_chars:
+            return False
+        if self.max_chars is not None and len(text) > int(self.max_chars):
+            return False
+        return True
+
+    def max_tokens_for(self, text):
+        """Output cap proportional to the input (chars/4 token estimate), or None."""
+        if self.max_tokens_ratio <= 0:
+            return None
+        cap = int(len(text) / 4 * self.max_tokens_ratio) + self.max_tokens_base
+        return min(self.max_tokens, cap) if self.max_tokens > 0 else cap
+
+    def record(self, latency, usage=None, error=False, truncated=False):
+        with self._lock:
+            self.stats["requests"] += 1
+            if error:
+                self.stats["errors"] += 1
+                return
+            if truncated:
+                self.stats["truncated"] += 1
+            self.latencies.append(latency)
+            if usage is not None:
+                self.stats["prompt_tokens"] += usage.prompt_tokens or 0
+                self.stats["completion_tokens"] += usage.completion_tokens or 0
+                # Prompt tokens served from the provider's prefix cache
+                details = getattr(usage, "prompt_tokens_details", None)
+                if details is not None:
+                    self.stats["cached_tokens"] += details.cached_tokens or 0
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+class ModelRouter:
+    """
+    Picks a route for each request from the `routing` config section.
+    The first matching route wins; a catch-all "default" route is always last.
+    """
+
+    def __init__(self, config):
+        settings = config.get("routing", {})
+        self.routes = [Route(route, settings) for route in settings.get("routes", [])]
+        if not any(not (r.modes or r.styles or r.min_chars or r.max_chars is not None) for r in self.routes):
+            self.routes.append(Route({"name": "default"}, settings))
+
+    def select(self, text, mode_context="", style=""):
+        for route in self.routes:
+            if route.matches(text, mode_context, style):
+                return route
+        return self.routes[-1]
+
+    def report(self):
+        lines = []
+        for route in self.routes:
+            s = route.stats
+            if not s["requests"]:
+                continue
+            p50, p95 = route.percentile(50), route.percentile(95)
+            latency = f"p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms" if p50 is not None else "no samples"
+            ok = max(1, s["requests"] - s["errors"])
+            cached = 100 * s["cached_tokens"] / max(1, s["prompt_tokens"])
+            lines.append(
+                f"  {route.name} ({route.model or 'default model'}): {s['requests']} requests, "
+                f"{s['errors']} errors, {s['truncated']} truncated, {latency}, "
+                f"avg tokens in/out {s['prompt_tokens'] / ok:.0f}/{s['completion_tokens'] / ok:.0f}, "
+                f"{cached:.0f}% of prompt tokens cached"
+            )
+        return "Routes:\n" + "\n".join(lines) if lines else "Routes: no requests"
@@ -1,47 +1,443 @@
 
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError
+import httpx
 import os
+import re
+import json
+import time
+import threading
+from src.endpoint_pool import Endpoint, EndpointPool, RequestCancelled
+from src.model_router import ModelRouter
+from src.request_scheduler import RequestScheduler
+from src.metrics import metrics
+
+# Appended to the system prompt when several independent lines share one request
+BATCH_INSTRUCTIONS = (
+    "\n\nBATCH INPUT: The user message holds {count} numbered lines like \"[1] text\". "
+    "Translate each line independently. Reply with exactly {count} lines, "
+    "each starting with its own number in the same \"[n] \" format. Nothing else."
+)
+BATCH_LINE = re.compile(r"^\[(\d+)\]\s?(.*)$")
+BATCH_INSTRUCTIONS_JSON = (
+    "\n\nBATCH INPUT: The user message is a JSON object of {count} numbered lines, "
+    "like {{\"1\": \"text\"}}. Translate each line independently. Reply with a JSON object "
+    "with exactly the same {count} keys in the same order, each mapped to its translation. Nothing else."
+)
 
 class OpenAIClient:
     def __init__(self, config):
         self.config = config.get("openai", {})
-        self.api_key = self.config.get("api_key", "").strip()
+        self.api_key = (self.config.get("api_key") or "").strip()
         self.model = self.config.get("model", "gpt-4o-mini")
         self.base_url = self.config.get("base_url")
-        
-        if self.api_key:
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
+
+        # Split timeouts: a dead network fails fast on connect, slow answers get read_timeout
+        self.timeout = httpx.Timeout(
+            connect=float(self.config.get("connect_timeout", 3.0)),
+            read=float(self.config.get("read_timeout", 10.0)),
+            write=float(self.config.get("write_timeout", 5.0)),
+            pool=float(self.config.get("pool_timeout", 2.0))
+        )
+        self.keepalive_interval = float(self.config.get("keepalive_interval", 60))
+        self._last_used = time.monotonic()
+        self._running = False
+        self.http_client = None
+
+        endpoint_configs = self.config.get("endpoints") or [{}]
+        # An empty "api_key:" in YAML is None: fall back to the top-level key
+        if any((ep.get("api_key") or self.api_key or "").strip() for ep in endpoint_configs):
+            self.http_client = self._build_http_client()
+
+        endpoints = []
+        for i, ep in enumerate(endpoint_configs):
+            api_key = (ep.get("api_key") or self.api_key or "").strip()
+            if not api_key:
+                continue
+            base_url = ep.get("base_url", self.base_url)
+            model = ep.get("model") or self.model
+            # One shared connection pool; httpx keeps connections per origin
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self.http_client,
+                timeout=self.timeout,
+                # Retries, backoff and Retry-After are handled by the request scheduler
+                max_retries=0
             )
+            endpoints.append(Endpoint(ep.get("name") or f"{i + 1}:{model}", client, model))
+        self.pool = EndpointPool(endpoints, self.config)
+        self.router = ModelRouter(config)
+        self.scheduler = RequestScheduler(config)
+
+        if endpoints:
+            self.client = endpoints[0].client
         else:
             self.client = None
             print("Warning: No OpenAI API key provided in config.yml")
 
-    def translate_text(self, text, prompt_template, style="strict"):
+    def _build_http_client(self):
+        """Explicit connection pool with keep-alive (and HTTP/2 when h2 is installed)."""
+        http2 = bool(self.config.get("http2", False))
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("Warning: openai.http2 needs the 'h2' package (pip install httpx[http2]). Using HTTP/1.1.")
+                http2 = False
+
+        max_connections = int(self.config.get("max_connections", 4))
+        return httpx.Client(
+            http2=http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=float(self.config.get("keepalive_expiry", 300))
+            )
+        )
+
+    def start(self):
+        """Open the connection now and keep it warm while idle (both optional)."""
+        if not self.client:
+            return
+        self._running = True
+        threading.Thread(target=self._keepalive_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self.http_client:
+            self.http_client.close()
+
+    def _ping(self, client=None):
+        """Cheap authenticated request that leaves a pooled, TLS-ready connection behind."""
+        started = time.perf_counter()
+        try:
+            (client or self.client).models.list()
+        except APIConnectionError as e:
+            print(f"OpenAI keep-alive ping failed: {e}")
+            return None
+        except Exception:
+            # Any HTTP status (e.g. 404 where /models isn't served) still leaves a warm connection
+            pass
+        self._last_used = time.monotonic()
+        return time.perf_counter() - started
+
+    def _keepalive_loop(self):
+        if self.config.get("warmup", True):
+            for endpoint in self.pool.endpoints:
+                elapsed = self._ping(endpoint.client)
+                if elapsed is not None:
+                    print(f"OpenAI connection ({endpoint.name}) warmed up in {elapsed * 1000:.0f} ms.")
+
+        if self.keepalive_interval <= 0:
+            return
+        while self._running:
+            idle = time.monotonic() - self._last_used
+            if idle >= self.keepalive_interval:
+                for endpoint in self.pool.endpoints:
+                    self._ping(endpoint.client)
+                idle = 0
+            time.sleep(max(1.0, self.keepalive_interval - idle))
+
+    def _request_args(self, endpoint, messages, route, json_format=False):
+        args = {"model": endpoint.model, "messages": messages, "timeout": self.timeout}
+        if json_format:
+            args["response_format"] = {"type": "json_object"}
+        if route is not None:
+            if route.model:
+                args["model"] = route.model
+            max_tokens = route.max_tokens_for(messages[-1]["content"])
+            if max_tokens:
+                args["max_tokens"] = max_tokens
+        return args
+
+    def _complete(self, endpoint, messages, cancel=None, route=None, json_format=False):
         """
-        Translates text using OpenAI.
+        One chat completion on one endpoint -> (content, finish_reason, usage).
+        Hedged calls (cancel given) are streamed, so the loser can drop its
+        connection as soon as it is told to.
+        """
+        args = self._request_args(endpoint, messages, route, json_format)
+        try:
+            with metrics.span("openai.completion", endpoint.name):
+                if cancel is None:
+                    response = endpoint.client.chat.completions.create(**args)
+                    choice = response.choices[0]
+                    return choice.message.content.strip(), choice.finish_reason, response.usage
+
+                parts = []
+                finish_reason = None
+                usage = None
+                stream = endpoint.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **args
+                )
+                try:
+                    for chunk in stream:
+                        if cancel.is_set():
+                            raise RequestCancelled()
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if chunk.choices:
+                            if chunk.choices[0].delta.content:
+                                parts.append(chunk.choices[0].delta.content)
+                            finish_reason = chunk.choices[0].finish_reason or finish_reason
+                finally:
+                    stream.close()
+                return "".join(parts).strip(), finish_reason, usage
+        finally:
+            self._last_used = time.monotonic()
+
+    @staticmethod
+    def _estimate_tokens(messages, route):
+        """Prompt plus expected output, chars/4, for the token bucket."""
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        output_tokens = route.max_tokens_for(messages[-1]["content"]) if route is not None else None
+        return prompt_tokens + (output_tokens or len(messages[-1]["content"]) // 4)
+
+    def _call(self, messages, route=None, json_format=False, priority="interactive"):
+        """
+        Runs one (possibly hedged) completion through the request scheduler
+        and records it against its route.
+        """
+        started = time.perf_counter()
+        try:
+            content, finish_reason, usage = self.scheduler.run(
+                lambda: self.pool.call(
+                    lambda endpoint, cancel: self._complete(endpoint, messages, cancel, route, json_format)
+                ),
+                self._estimate_tokens(messages, route),
+                priority
+            )
+        except Exception:
+            if route is not None:
+                route.record(time.perf_counter() - started, error=True)
+            raise
+
+        truncated = finish_reason == "length"
+        if route is not None:
+            route.record(time.perf_counter() - started, usage, truncated=truncated)
+        if truncated:
+            # A cut-off translation is worse than the original text
+            raise ValueError("reply hit the output token cap")
+        return content
+
+    def report(self):
+        report = self.router.report() + "\n" + self.scheduler.report()
+        if len(self.pool.endpoints) > 1:
+            report = self.pool.report() + "\n" + report
+        return report
+
+    @staticmethod
+    def _system_messages(prompt, style, extra=""):
+        """
+        A PromptVariant's system messages, or a plain prompt.txt-style template
+        formatted with style. extra is appended to the last (per-request) message.
+        """
+        if isinstance(prompt, str):
+            messages = [{"role": "system", "content": prompt.format(style=style)}]
+        else:
+            messages = list(prompt.messages)
+        if extra:
+            messages[-1] = {"role": "system", "content": messages[-1]["content"] + extra}
+        return messages
+
+    def translate_text(self, text, prompt, style="strict", route=None, priority="interactive"):
+        """
+        Translates text using OpenAI (model and output cap from route, if given).
+        prompt is a PromptVariant, or a template string formatted with style.
+        priority is "interactive" (hotkey) or "background" (prefetch, batch), or an Urgency.
         Returns original text on ANY failure (hard fallback).
         """
         if not self.client or not text.strip():
             return text
 
         try:
-            # Format the system prompt
-            system_prompt = prompt_template.format(style=style)
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": text}
-                ],
-                timeout=10  # strict timeout
-            )
-            
-            translated_text = response.choices[0].message.content.strip()
-            return translated_text
-            
+            messages = self._system_messages(prompt, style)
+            messages.append({"role": "user", "content": text})
+            return self._call(messages, route, priority=priority)
+
         except Exception as e:
             print(f"OpenAI translation failed: {e}")
             return text
+
+    def translate_stream(self, text, prompt, style="strict", route=None, priority="interactive"):
+        """
+        Yields the translation in pieces as the completion streams in.
+        Raises on failure: the caller owns the fallback, since it may already
+        have output part of the text.
+        """
+        if not self.client:
+            raise RuntimeError("No OpenAI API key configured")
+
+        # Output is already on screen as it streams, so no hedging: use the best endpoint
+        endpoint = self.pool.primary()
+        messages = self._system_messages(prompt, style)
+        messages.append({"role": "user", "content": text})
+        endpoint.stats["requests"] += 1
+        started = time.perf_counter()
+        try:
+            # Rate limits are reported when the request is made, before any output
+            stream = self.scheduler.run(
+                lambda: endpoint.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True},
+                    **self._request_args(endpoint, messages, route)
+                ),
+                self._estimate_tokens(messages, route),
+                priority
+            )
+        except Exception:
+            endpoint.record_failure()
+            if route is not None:
+                route.record(time.perf_counter() - started, error=True)
+            raise
+
+        finish_reason = None
+        usage = None
+        first_token = True
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices:
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    if chunk.choices[0].delta.content:
+                        if first_token:
+                            first_token = False
+                            metrics.observe("openai.first_token", time.perf_counter() - started, endpoint.name)
+                        yield chunk.choices[0].delta.content
+            endpoint.record_success(time.perf_counter() - started)
+        except Exception:
+            endpoint.record_failure()
+            if route is not None:
+                route.record(time.perf_counter() - started, error=True)
+            raise
+        finally:
+            stream.close()
+            self._last_used = time.monotonic()
+
+        if route is not None:
+            route.record(time.perf_counter() - started, usage, truncated=finish_reason == "length")
+        if finish_reason == "length":
+            raise ValueError("reply hit the output token cap")
+
+    def translate_batch(self, texts, prompt, style="strict", route=None, priority="interactive"):
+        """
+        Translates independent lines, packed into as few requests as the
+        batch_max_lines / batch_max_tokens limits allow.
+        Returns a list aligned with texts, holding None for any line whose
+        batch request failed, or that was still missing after its malformed
+        batch was split and retried.
+        Returns None only if no line could be translated.
+        """
+        if not texts:
+            return []
+        if not self.client:
+            return None
+
+        results = []
+        for chunk in self._batch_chunks(texts):
+            results.extend(self._translate_chunk(chunk, prompt, style, route, priority))
+        if all(result is None for result in results):
+            return None
+        return results
+
+    def _batch_chunks(self, texts):
+        """Splits texts into runs within the per-request line and token limits."""
+        max_lines = max(1, int(self.config.get("batch_max_lines", 20)))
+        max_tokens = int(self.config.get("batch_max_tokens", 1500))
+        chunk, tokens = [], 0
+        for text in texts:
+            # chars/4 estimate plus the per-line numbering overhead
+            cost = len(text) // 4 + 4
+            if chunk and (len(chunk) >= max_lines or (max_tokens > 0 and tokens + cost > max_tokens)):
+                yield chunk
+                chunk, tokens = [], 0
+            chunk.append(text)
+            tokens += cost
+        if chunk:
+            yield chunk
+
+    def _translate_chunk(self, texts, prompt, style, route, priority):
+        """
+        One batched request; lines missing from a malformed reply are retried
+        in smaller batches. An API or transport error fails the whole chunk
+        once: splitting would only multiply the calls into the same outage.
+        """
+        if len(texts) == 1:
+            translated = self.translate_text(texts[0], prompt, style, route, priority)
+            return [None if translated == texts[0] else translated]
+
+        try:
+            results = self._request_batch(texts, prompt, style, route, priority)
+        except Exception as e:
+            print(f"OpenAI batch translation failed for {len(texts)} lines: {e}")
+            return [None] * len(texts)
+
+        bad = [i for i, result in enumerate(results) if result is None]
+        if not bad:
+            return results
+        print(f"OpenAI batch reply malformed: {len(bad)} of {len(texts)} lines missing, retrying them.")
+
+        if len(bad) == len(texts):
+            # Nothing usable: halve the batch, since smaller ones fail less often
+            middle = len(texts) // 2
+            return (self._translate_chunk(texts[:middle], prompt, style, route, priority)
+                    + self._translate_chunk(texts[middle:], prompt, style, route, priority))
+
+        retried = self._translate_chunk([texts[i] for i in bad], prompt, style, route, priority)
+        for i, result in zip(bad, retried):
+            results[i] = result
+        return results
+
+    def _request_batch(self, texts, prompt, style, route, priority):
+        """
+        Sends texts as one numbered or JSON batch and validates the reply.
+        Returns a list aligned with texts; lines that are missing, empty,
+        duplicated or out of order are None.
+        """
+        json_format = str(self.config.get("batch_format", "numbered")).lower() == "json"
+        # Newlines inside an entry would break the numbering
+        lines = [" ".join(text.split()) for text in texts]
+
+        if json_format:
+            instructions = BATCH_INSTRUCTIONS_JSON.format(count=len(texts))
+            user_content = json.dumps({str(i): line for i, line in enumerate(lines, 1)}, ensure_ascii=False)
+        else:
+            instructions = BATCH_INSTRUCTIONS.format(count=len(texts))
+            user_content = "\n".join(f"[{i}] {line}" for i, line in enumerate(lines, 1))
+
+        # Batch instructions go after the shared prefix, not into it
+        messages = self._system_messages(prompt, style, instructions)
+        messages.append({"role": "user", "content": user_content})
+        reply = self._call(messages, route, json_format, priority)
+
+        entries = []   # (number, text) in reply order
+        if json_format:
+            try:
+                parsed = json.loads(reply)
+            except ValueError:
+                parsed = {}
+            if isinstance(parsed, dict):
+                for key, value in parsed.items():
+                    if str(key).isdigit() and isinstance(value, str):
+                        entries.append((int(key), value.strip()))
+        else:
+            for line in reply.splitlines():
+                match = BATCH_LINE.match(line.strip())
+                if match:
+                    entries.append((int(match.group(1)), match.group(2).strip()))
+
+        results = [None] * len(texts)
+        seen = set()
+        last = 0
+        for number, text in entries:
+            if number in seen:
+                # Duplicated number: neither copy can be trusted
+                if 1 <= number <= len(texts):
+                    results[number - 1] = None
+                continue
+            seen.add(number)
+            if 1 <= number <= len(texts) and number > last and text:
+                results[number - 1] = text
+            last = max(last, number)
+        return results
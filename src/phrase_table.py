@@ -0,0 +1,124 @@
+
+import threading
+from collections import Counter
+from src.command_parser import parse_command
+from src.text_normalizer import normalize, transplant_punctuation
+from src.text_segmenter import split_segments, is_translatable, join_segments
+
+def _sentences(text):
+    return [core for _, core, _ in split_segments(text) if is_translatable(core)]
+
+def _match_case(translation, source):
+    """Capitalizes a phrase used at the start of a capitalized source sentence."""
+    if source[:1].isupper() and translation[:1].islower():
+        return translation[:1].upper() + translation[1:]
+    return translation
+
+def compile_phrases(log_rows, min_count=3, min_confidence=0.8, hit_rows=()):
+    """
+    Mines (original, result, style) log rows for phrases that keep getting
+    the same translation, per style and mode. Whole lines are always used;
+    their sentences too when source and translation split into the same
+    number of sentences. Returns [(scope, norm, result, count, confidence, hits)]
+    for the phrases whose most common translation was logged at least
+    min_count times (count) with at least a min_confidence share.
+    hits is how often the cache replayed that translation, from hit_rows
+    (scope, norm, result, hit_count) of CacheLayer.phrase_evidence: a replay
+    is the same model output again, not an independent translation, so it
+    is a popularity signal only and never counts towards the thresholds.
+    """
+    seen = {}   # (scope, norm) -> Counter of translations
+    for original, result, style in log_rows:
+        if not original or not result:
+            continue
+        _, text, mode_context = parse_command(original)
+        if not text:
+            continue
+        # Same scope as the cache key; logged styles are already effective ones
+        scope = f"{style}::{mode_context}"
+
+        pairs = {(normalize(text), result.strip())}
+        sources, targets = _sentences(text), _sentences(result)
+        if len(sources) > 1 and len(sources) == len(targets):
+            pairs.update((normalize(source), target) for source, target in zip(sources, targets))
+        for norm, translated in pairs:
+            if norm and translated:
+                seen.setdefault((scope, norm), Counter())[translated] += 1
+
+    replays = Counter()   # (scope, norm, result) -> cache hits
+    for scope, norm, result, hits in hit_rows:
+        if norm and result and result.strip():
+            replays[(scope, norm, result.strip())] += hits
+
+    phrases = []
+    for (scope, norm), translations in seen.items():
+        best, count = translations.most_common(1)[0]
+        # count is stored and later filtered on (load_phrases), so filter on it here too
+        if count < min_count:
+            continue
+        confidence = count / sum(translations.values())
+        if confidence >= min_confidence:
+            phrases.append((scope, norm, best, count, confidence, replays[(scope, norm, best)]))
+    return phrases
+
+class PhraseTable:
+    """
+    Local fast path in front of the API: translates a line when every one of
+    its sentences (or the whole line) is a phrase compiled from the log.
+    """
+
+    def __init__(self, rows, disabled_styles=()):
+        # scope -> {normalized phrase: translation}
+        self.phrases = {}
+        for scope, norm, result in rows:
+            self.phrases.setdefault(scope, {})[norm] = result
+        self.disabled_styles = set(disabled_styles)
+        self.stats = {"avoided": 0, "partial": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cache(cls, cache, settings):
+        rows = cache.load_phrases(
+            int(settings.get("min_count", 3)), float(settings.get("min_confidence", 0.8))
+        )
+        return cls(rows, settings.get("disabled_styles") or ())
+
+    def _count(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+
+    def translate(self, text, style, scope, record=True):
+        """The translation of text if the table covers all of it, else None."""
+        if style in self.disabled_styles:
+            return None
+        table = self.phrases.get(scope)
+        if not table:
+            return None
+
+        whole = table.get(normalize(text))
+        if whole is not None:
+            if record:
+                self._count("avoided")
+            return transplant_punctuation(whole, text)
+
+        segments = split_segments(text)
+        translations = {}
+        for _, core, _ in segments:
+            if not is_translatable(core) or core in translations:
+                continue
+            phrase = table.get(normalize(core))
+            if phrase is None:
+                if translations and record:
+                    self._count("partial")
+                return None
+            translations[core] = _match_case(transplant_punctuation(phrase, core), core)
+        if not translations:
+            return None
+        if record:
+            self._count("avoided")
+        return join_segments(segments, translations)
+
+    def report(self):
+        size = sum(len(table) for table in self.phrases.values())
+        return (f"Phrase table: {size} phrases, API calls avoided={self.stats['avoided']}, "
+                f"partly covered={self.stats['partial']}")
@@ -0,0 +1,103 @@
+
+import time
+import threading
+from collections import deque
+
+class PrefetchWatcher:
+    """
+    Opt-in background translation of new clipboard / primary-selection content,
+    so the cache is already warm when the hotkey is pressed.
+    Content must stay unchanged for a settle period, and prefetches are limited
+    by length, a minimum interval and an hourly token budget.
+    """
+
+    def __init__(self, config, clipboard, core):
+        settings = config.get("prefetch", {})
+        self.clipboard = clipboard
+        self.core = core
+        self.enabled = bool(settings.get("enabled", False))
+
+        selection = str(settings.get("selection", "clipboard")).lower()
+        self.selections = ["clipboard", "primary"] if selection == "both" else [selection]
+        self.poll_interval = float(settings.get("poll_interval", 0.25))
+        self.settle = float(settings.get("settle", 0.4))
+        self.min_chars = int(settings.get("min_chars", 8))
+        self.max_chars = int(settings.get("max_chars", 400))
+        self.min_interval = float(settings.get("min_interval", 2.0))
+        self.token_budget = int(settings.get("token_budget", 20000))
+
+        self.running = False
+        self.thread = None
+        self._last = {name: "" for name in self.selections}
+        self._candidate = None   # (text, first_seen)
+        self._last_prefetch = 0.0
+        self._spent = deque()    # (time, estimated tokens) within the last hour
+        self.stats = {
+            "seen": 0, "prefetched": 0, "cached": 0,
+            "skipped_length": 0, "skipped_rate": 0, "skipped_budget": 0
+        }
+
+    def start(self):
+        if not self.enabled:
+            return
+        print(f"Prefetch watcher on: {', '.join(self.selections)}")
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stops watching and waits up to timeout seconds for a prefetch in progress."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _estimate_tokens(self, text):
+        # Rough chars/4 heuristic: prompt + input + a similar-sized output
+        return (len(self.core.pipeline.prompt_template) + 2 * len(text)) // 4
+
+    def _budget_left(self, now):
+        while self._spent and now - self._spent[0][0] > 3600:
+            self._spent.popleft()
+        return self.token_budget - sum(tokens for _, tokens in self._spent)
+
+    def _loop(self):
+        while self.running:
+            now = time.monotonic()
+            for selection in self.selections:
+                text = self.clipboard.peek(selection)
+                if text and text != self._last[selection]:
+                    self._last[selection] = text
+                    if not self.clipboard.is_own(text):
+                        self.stats["seen"] += 1
+                        self._candidate = (text, now)
+
+            if self._candidate and now - self._candidate[1] >= self.settle:
+                text = self._candidate[0]
+                self._candidate = None
+                self._consider(text, now)
+
+            time.sleep(self.poll_interval)
+
+    def _consider(self, text, now):
+        if not (self.min_chars <= len(text) <= self.max_chars):
+            self.stats["skipped_length"] += 1
+            return
+        if now - self._last_prefetch < self.min_interval:
+            self.stats["skipped_rate"] += 1
+            return
+
+        tokens = self._estimate_tokens(text)
+        if self.token_budget > 0 and tokens > self._budget_left(now):
+            self.stats["skipped_budget"] += 1
+            return
+
+        try:
+            if self.core.prefetch(text):
+                self._last_prefetch = now
+                self._spent.append((now, tokens))
+                self.stats["prefetched"] += 1
+                print(f"Prefetched: {text[:50]}...")
+            else:
+                self.stats["cached"] += 1
+        except Exception as e:
+            print(f"Prefetch error: {e}")
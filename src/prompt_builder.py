@@ -0,0 +1,43 @@
+
+import threading
+from src.command_parser import ACTION_CONTEXT, DESCRIPTION_CONTEXT, DIALOGUE_CONTEXT
+
+# Stands in for {style} in the shared prefix; the real value comes in the context message
+STYLE_PLACEHOLDER = "STYLE"
+
+class PromptVariant:
+    """The system messages for one (style, mode): shared prefix + short context."""
+
+    def __init__(self, prefix_message, style, mode_context):
+        self.style = style
+        self.mode_context = mode_context
+        self.messages = (
+            prefix_message,
+            {"role": "system", "content": f"{STYLE_PLACEHOLDER}: {style}\n[SYSTEM CONTEXT]: {mode_context}"}
+        )
+
+class PromptBuilder:
+    """
+    Renders prompt.txt once into a byte-identical system prefix, so the
+    provider's prompt cache can reuse it across every style and mode.
+    The per-request style and mode go into a second, short system message.
+    """
+
+    def __init__(self, template, styles=(), modes=(ACTION_CONTEXT, DESCRIPTION_CONTEXT, DIALOGUE_CONTEXT)):
+        self.template = template
+        self.prefix = template.format(style=STYLE_PLACEHOLDER).rstrip()
+        self._prefix_message = {"role": "system", "content": self.prefix}
+        self._variants = {}
+        self._lock = threading.Lock()
+        for style in styles:
+            for mode_context in modes:
+                self.variant(style, mode_context)
+
+    def variant(self, style, mode_context):
+        """The precomputed variant for (style, mode), rendered on first use if new."""
+        key = (style, mode_context)
+        variant = self._variants.get(key)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.setdefault(key, PromptVariant(self._prefix_message, style, mode_context))
+        return variant
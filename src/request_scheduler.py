@@ -0,0 +1,218 @@
+
+import time
+import heapq
+import random
+import itertools
+import threading
+from openai import RateLimitError, APIConnectionError, InternalServerError
+from src.metrics import metrics
+
+# Lower runs first: a hotkey press never queues behind prefetch or batch work
+PRIORITIES = {"interactive": 0, "background": 1}
+
+class DeadlineExceeded(Exception):
+    """The request could not be sent (or retried) before its deadline."""
+
+class SchedulerBusy(Exception):
+    """Too many background requests are already waiting."""
+
+class Urgency:
+    """
+    A request's priority, which may be raised while it waits or retries
+    (RequestScheduler.promote). Pass it to run() in place of a priority name.
+    """
+
+    def __init__(self, priority="interactive"):
+        self.priority = priority
+        # Set on promotion: the promoted priority's deadline, counted from then
+        self.deadline = None
+
+class TokenBucket:
+    """Refills continuously at per_minute; holds at most one minute's worth (0 = unlimited)."""
+
+    def __init__(self, per_minute):
+        self.rate = float(per_minute) / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        if self.rate > 0:
+            self._refill(now)
+            self.level -= min(amount, self.capacity)
+
+class RequestScheduler:
+    """
+    Gatekeeper for every API call: request and token buckets, a shared
+    cool-down after 429s (honouring Retry-After), jittered exponential
+    backoff on transient errors, and per-priority deadlines. Interactive
+    requests always go ahead of waiting background ones.
+    """
+
+    def __init__(self, config):
+        settings = config.get("rate_limit", {})
+        self.requests = TokenBucket(settings.get("requests_per_minute", 0))
+        self.tokens = TokenBucket(settings.get("tokens_per_minute", 0))
+        self.max_retries = int(settings.get("max_retries", 4))
+        self.backoff_base = float(settings.get("backoff_base", 0.5))
+        self.backoff_max = float(settings.get("backoff_max", 20.0))
+        self.deadlines = {
+            PRIORITIES["interactive"]: float(settings.get("interactive_deadline", 8.0)),
+            PRIORITIES["background"]: float(settings.get("background_deadline", 120.0))
+        }
+        self.max_background_queue = int(settings.get("max_background_queue", 16))
+
+        self._cond = threading.Condition()
+        self._waiting = []   # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cooldown_until = 0.0
+        self.stats = {
+            "queue_depth": 0, "max_queue_depth": 0, "throttled": 0, "rate_limited": 0,
+            "retries": 0, "deadline_exceeded": 0, "rejected": 0
+        }
+
+    @staticmethod
+    def _rank(priority):
+        return PRIORITIES.get(priority, PRIORITIES["background"])
+
+    @staticmethod
+    def _deadline(deadline, urgency):
+        return deadline if urgency.deadline is None else min(deadline, urgency.deadline)
+
+    def promote(self, urgency, priority="interactive"):
+        """
+        Raises a waiting or running request to priority (never lowers it):
+        it moves up the queue and gets that priority's deadline from now on.
+        """
+        rank = self._rank(priority)
+        with self._cond:
+            if rank >= self._rank(urgency.priority):
+                return
+            urgency.priority = priority
+            urgency.deadline = time.monotonic() + self.deadlines[rank]
+            self._cond.notify_all()
+
+    def _acquire(self, tokens, urgency, deadline):
+        with self._cond:
+            rank = self._rank(urgency.priority)
+            if rank > 0 and sum(1 for r, _ in self._waiting if r > 0) >= self.max_background_queue:
+                self.stats["rejected"] += 1
+                raise SchedulerBusy("request queue is full")
+
+            ticket = (rank, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            self.stats["queue_depth"] = len(self._waiting)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiting))
+            throttled = False
+            queued = time.monotonic()
+            try:
+                while True:
+                    if self._rank(urgency.priority) != rank:
+                        # Promoted while waiting: requeue ahead of the background work
+                        rank = self._rank(urgency.priority)
+                        self._waiting.remove(ticket)
+                        ticket = (rank, ticket[1])
+                        self._waiting.append(ticket)
+                        heapq.heapify(self._waiting)
+                        deadline = self._deadline(deadline, urgency)
+
+                    now = time.monotonic()
+                    wait = None   # not at the head: sleep until someone ahead leaves
+                    if self._waiting[0] == ticket:
+                        wait = max(self._cooldown_until - now,
+                                   self.requests.wait_time(1, now),
+                                   self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1, now)
+                            self.tokens.take(tokens, now)
+                            metrics.observe("openai.queue_wait", now - queued,
+                                            "interactive" if rank == 0 else "background")
+                            return
+                        if not throttled:
+                            throttled = True
+                            self.stats["throttled"] += 1
+
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        # Fail now rather than wait for a slot that comes too late
+                        self.stats["deadline_exceeded"] += 1
+                        raise DeadlineExceeded(f"no request slot within {self.deadlines[rank]:g} s")
+                    self._cond.wait(remaining if wait is None else wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self.stats["queue_depth"] = len(self._waiting)
+                self._cond.notify_all()
+
+    @staticmethod
+    def _retry_after(error):
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            value = headers.get(name)
+            if value is None:
+                continue
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                # HTTP-date form: fall back to our own backoff
+                return None
+        return None
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads out retries from several workers hitting the same limit
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying error, or None if it should not be retried."""
+        if isinstance(error, RateLimitError):
+            self.stats["rate_limited"] += 1
+            delay = self._retry_after(error)
+            if delay is None:
+                delay = self._backoff(attempt)
+            # Every queued request waits out the cool-down, not just this one
+            with self._cond:
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            return 0.0
+        if isinstance(error, (APIConnectionError, InternalServerError)):
+            return self._backoff(attempt)
+        return None
+
+    def run(self, fn, tokens=0, priority="interactive"):
+        """
+        Calls fn() once a request slot is free, retrying rate limits and
+        transient errors until max_retries or the priority's deadline.
+        priority is a name or an Urgency.
+        """
+        urgency = priority if isinstance(priority, Urgency) else Urgency(priority)
+        deadline = time.monotonic() + self.deadlines[self._rank(urgency.priority)]
+        attempt = 0
+        while True:
+            self._acquire(tokens, urgency, self._deadline(deadline, urgency))
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                if time.monotonic() + delay >= self._deadline(deadline, urgency):
+                    self.stats["deadline_exceeded"] += 1
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                wait = max(delay, self._cooldown_until - time.monotonic())
+                print(f"OpenAI request failed ({type(e).__name__}), retry {attempt} in {wait:.1f} s")
+                time.sleep(delay)
+
+    def report(self):
+        return "Request scheduler: " + ", ".join(f"{name}={count}" for name, count in self.stats.items())
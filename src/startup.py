@@ -0,0 +1,170 @@
+
+import time
+import threading
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import metrics
+
+# Imported on a background thread as soon as the process starts (the SDK
+# pulls in httpx and pydantic: most of the start-up time before this)
+HEAVY_MODULES = ("openai", "src.openai_client")
+
+def preload(modules=HEAVY_MODULES):
+    """Starts importing modules in the background; a later import just waits for it."""
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Background import of {name} failed: {e}")
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+class StartupTimer:
+    """Records when each start-up phase began and how long it took, from launch."""
+
+    def __init__(self, launched=None):
+        self.launched = time.perf_counter() if launched is None else launched
+        self.phases = []   # (name, start offset, seconds)
+        self.marks = []    # (name, offset)
+        self._lock = threading.Lock()
+
+    def timed(self, name, fn, *args):
+        """Runs fn(*args) as phase name and returns its result."""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.phases.append((name, started - self.launched, seconds))
+
+    def mark(self, name):
+        """Records a point in time, e.g. when the hotkey became live."""
+        offset = time.perf_counter() - self.launched
+        with self._lock:
+            self.marks.append((name, offset))
+
+    def publish(self):
+        """Records the phases as metrics (once the metrics sink exists), to track regressions."""
+        for name, _, seconds in self.phases:
+            metrics.observe(f"startup.{name}", seconds)
+        for name, offset in self.marks:
+            metrics.observe(f"startup.{name.replace(' ', '_')}", offset)
+
+    def report(self):
+        lines = [f"{'start-up phase':<18}{'at ms':>8}{'took ms':>9}"]
+        for name, offset, seconds in sorted(self.phases, key=lambda phase: phase[1]):
+            lines.append(f"{name:<18}{offset * 1000:>8.0f}{seconds * 1000:>9.0f}")
+        for name, offset in self.marks:
+            lines.append(f"{name:<18}{offset * 1000:>8.0f}")
+        return "\n".join(lines)
+
+class DeferredHandler:
+    """
+    Hotkey handler installed before the translator is built: presses made
+    while it is still starting wait (on the scheduler's worker) until it is
+    ready, instead of failing.
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.target = None
+        self._ready = threading.Event()
+
+    def ready(self, target):
+        self.target = target
+        self._ready.set()
+
+    def fail(self):
+        """Start-up failed: release waiting presses, which are then dropped."""
+        self._ready.set()
+
+    def __call__(self, *args):
+        if not self._ready.is_set():
+            print("Still starting up; the press runs as soon as the translator is ready.")
+            if not self._ready.wait(self.timeout):
+                print("Translator was not ready in time; press dropped.")
+                return
+        if self.target is None:
+            print("Translator failed to start; press dropped.")
+            return
+        self.target(*args)
+
+def _make_cache(config):
+    from src.cache_layer import CacheLayer
+    return CacheLayer(db_path=config["cache"]["db_path"], options=config["cache"])
+
+def _make_clipboard(config):
+    from src.clipboard_handler import ClipboardHandler
+    return ClipboardHandler(config)
+
+def _make_openai(config):
+    from src.openai_client import OpenAIClient
+    openai = OpenAIClient(config)
+    # Warm the HTTPS connection in the background so the first press doesn't pay the handshake
+    openai.start()
+    return openai
+
+def _make_core(config, cache, clipboard):
+    from src.translator_core import TranslatorCore
+    return TranslatorCore(config, cache, clipboard)
+
+def close_services(cache=None, clipboard=None, openai=None, core=None):
+    """
+    Closes whichever services were built: the core first, the cache (which
+    flushes its queued writes) last. One failing doesn't stop the others.
+    """
+    steps = (("core", core, "close"), ("clipboard", clipboard, "close"),
+             ("OpenAI client", openai, "stop"), ("cache", cache, "close"))
+    for name, service, method in steps:
+        if service is None:
+            continue
+        try:
+            getattr(service, method)()
+        except Exception as e:
+            print(f"Error closing {name}: {e}")
+
+def _built(future):
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+def build_services(config, timer, parallel=True):
+    """
+    Builds cache, clipboard, OpenAI client and translator core.
+    With parallel, the OpenAI client (SDK import, HTTP pool) is built while
+    the cache, clipboard and core (UInput) are set up.
+    Returns (cache, clipboard, openai, core). If one fails, the ones already
+    built are closed before the error is raised.
+    """
+    if not parallel:
+        cache = clipboard = openai = core = None
+        try:
+            cache = timer.timed("cache", _make_cache, config)
+            clipboard = timer.timed("clipboard", _make_clipboard, config)
+            openai = timer.timed("openai", _make_openai, config)
+            core = timer.timed("core", _make_core, config, cache, clipboard)
+        except Exception:
+            close_services(cache, clipboard, openai, core)
+            raise
+        core.set_openai(openai)
+        return cache, clipboard, openai, core
+
+    core = None
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as executor:
+        openai_future = executor.submit(timer.timed, "openai", _make_openai, config)
+        cache_future = executor.submit(timer.timed, "cache", _make_cache, config)
+        clipboard_future = executor.submit(timer.timed, "clipboard", _make_clipboard, config)
+        try:
+            core = timer.timed("core", _make_core, config, cache_future.result(), clipboard_future.result())
+            openai = openai_future.result()
+        except Exception:
+            # e.g. the cache's writer thread must not outlive a failed start
+            close_services(_built(cache_future), _built(clipboard_future), _built(openai_future), core)
+            raise
+    core.set_openai(openai)
+    return cache_future.result(), clipboard_future.result(), openai, core
@@ -0,0 +1,38 @@
+
+import re
+
+TRAILING_PUNCT = re.compile(r"[\s.!?…]+$")
+SENTENCE_END = re.compile(r"[.!?…]$")
+
+def _fold_word(word):
+    """Lower-cases a sentence-initial 'Capitalized' word; CAPS and @IDs are kept."""
+    if word.startswith("@") or len(word) < 2:
+        return word.lower() if word.isalpha() else word
+    if word[0].isupper() and word[1:] == word[1:].lower():
+        return word.lower()
+    return word
+
+def normalize(text):
+    """
+    Builds the normalized cache key for text.
+    Collapses whitespace, drops trailing punctuation and folds the capital
+    letter that only marks the start of a sentence. Proper names inside a
+    sentence, @IDs and CAPS words keep their case because prompt.txt
+    requires them to be preserved.
+    """
+    words = TRAILING_PUNCT.sub("", " ".join(text.split())).split(" ")
+    folded = []
+    sentence_start = True
+    for word in words:
+        folded.append(_fold_word(word) if sentence_start else word)
+        sentence_start = bool(SENTENCE_END.search(word))
+    return " ".join(folded)
+
+def trailing_punctuation(text):
+    """Returns the trailing .!? run of text (without whitespace)."""
+    match = TRAILING_PUNCT.search(text)
+    return "".join(match.group().split()) if match else ""
+
+def transplant_punctuation(result, source):
+    """Gives a cached result the trailing punctuation of the text being translated."""
+    return TRAILING_PUNCT.sub("", result) + trailing_punctuation(source)
@@ -0,0 +1,49 @@
+
+import re
+
+# Parenthesized spans are actions in RP text (see prompt.txt) and are kept whole
+ACTION_SPAN = re.compile(r"(\([^()]*\))")
+# Sentence boundary: terminal punctuation followed by whitespace
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])(\s+)")
+
+def split_segments(text):
+    """
+    Splits text into sentence and (action) segments.
+    Returns a list of (leading_ws, core, trailing_ws) tuples; joining every
+    part in order reproduces the input exactly.
+    """
+    segments = []
+    for chunk in ACTION_SPAN.split(text):
+        if not chunk:
+            continue
+        if ACTION_SPAN.fullmatch(chunk):
+            pieces = [chunk]
+        else:
+            pieces = SENTENCE_BREAK.split(chunk)
+
+        for piece in pieces:
+            if not piece:
+                continue
+            core = piece.strip()
+            if not core:
+                # Pure whitespace between segments: attach to the previous one
+                if segments:
+                    lead, prev, trail = segments[-1]
+                    segments[-1] = (lead, prev, trail + piece)
+                else:
+                    segments.append((piece, "", ""))
+                continue
+            start = piece.index(core)
+            segments.append((piece[:start], core, piece[start + len(core):]))
+    return segments
+
+def is_translatable(core):
+    """A segment needs translating only if it contains letters."""
+    return any(ch.isalpha() for ch in core)
+
+def join_segments(segments, translations):
+    """Reassembles segments, substituting translations (a core -> text dict)."""
+    return "".join(
+        lead + translations.get(core, core) + trail
+        for lead, core, trail in segments
+    )
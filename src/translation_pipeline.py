@@ -0,0 +1,227 @@
+
+from src.text_segmenter import split_segments, is_translatable, join_segments
+from src.hotkey_scheduler import SingleFlight
+from src.command_parser import parse_command, effective_style
+from src.prompt_builder import PromptBuilder
+from src.phrase_table import PhraseTable
+
+class TranslationRequest:
+    """Everything the translation stage needs for one input line."""
+
+    def __init__(self, original_text, command_token, text, mode_context, style,
+                 cache_key_extra, prompt, route, priority="interactive"):
+        self.original_text = original_text
+        self.command_token = command_token
+        self.text = text                    # the translatable body, without the command
+        self.mode_context = mode_context
+        self.style = style                  # effective style (RP commands are always strict)
+        self.cache_key_extra = cache_key_extra
+        self.prompt = prompt
+        self.route = route
+        self.priority = priority            # "interactive" (hotkey) or "background"
+
+    @property
+    def key(self):
+        return (self.text, self.cache_key_extra)
+
+    def assemble(self, translated_body):
+        """Puts the command token back in front of the translated body."""
+        if self.command_token:
+            return f"{self.command_token} {translated_body}"
+        return translated_body
+
+class TranslationPipeline:
+    """
+    Command parsing, cache lookup and OpenAI translation, with no clipboard or
+    key injection, so the hotkey path and the batch CLI share one code path.
+    """
+
+    def __init__(self, config, cache, openai_client):
+        self.config = config
+        self.cache = cache
+        self.openai = openai_client
+        self.style = config.get("style", "strict")
+        self.segment_mode = bool(config.get("cache", {}).get("segment_mode", False))
+        self.verbose = True
+
+        # Identical texts translated concurrently share one API call
+        self.inflight = SingleFlight()
+
+        # Determine prompt file path
+        self.prompt_path = config.get("prompt_file", "prompt.txt")
+        self.prompt_template = self._load_prompt()
+        # Shared system prefix + per-(style, mode) context, rendered once up front
+        # for the configured style and every style bound to an extra hotkey
+        styles = {self.style, "strict"} | {s for s in (config.get("hotkeys") or {}).values() if s}
+        self.prompts = PromptBuilder(self.prompt_template, styles=sorted(styles))
+
+        # Learned local fast path for phrases the log has seen many times
+        self.phrases = None
+        settings = config.get("phrase_table", {})
+        if settings.get("enabled", True):
+            self.phrases = PhraseTable.from_cache(cache, settings)
+
+    def _load_prompt(self):
+        try:
+            with open(self.prompt_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except Exception:
+            return "Translate the following text to English (Style: {style}):"
+
+    def prepare(self, original_text, priority="interactive", style=None):
+        """
+        Parses the command and derives style, mode, cache key, prompt and route.
+        style overrides the configured style (e.g. for a hotkey bound to one).
+        Returns a TranslationRequest, or None when there is nothing to translate.
+        """
+        command_token, translatable_text, mode_context = parse_command(original_text)
+        if not translatable_text:
+            return None
+
+        # Determine Style override for RP commands
+        # RP commands must ALWAYS be strict, covering the user's requirement.
+        style = effective_style(command_token, style or self.style)
+
+        # Style and mode go into a short message after the shared prompt prefix
+        # This ensures the AI sees the rule without seeing the token
+        prompt = self.prompts.variant(style, mode_context)
+
+        # Cache key includes the EFFECTIVE style and mode but NOT the command token itself,
+        # so strict RP translations are cached separately and bodies stay reusable
+        cache_key_extra = f"{style}::{mode_context}"
+
+        # Model and output cap are picked from the routing table by length, mode and style
+        route = self.openai.router.select(translatable_text, mode_context, style)
+
+        return TranslationRequest(original_text, command_token, translatable_text, mode_context,
+                                  style, cache_key_extra, prompt, route, priority)
+
+    def lookup(self, request, record=True):
+        """
+        Cache lookup for the request body, then the phrase table
+        -> (result, kind) with kind a cache hit kind or "phrase", or (None, "miss").
+        """
+        cached, kind = self.cache.lookup(request.text, request.cache_key_extra, record=record)
+        if cached is None and self.phrases is not None:
+            phrased = self.phrases.translate(request.text, request.style, request.cache_key_extra, record)
+            if phrased is not None:
+                return phrased, "phrase"
+        return cached, kind
+
+    def store(self, request, translated_body):
+        """Caches the BODY (without command) and logs the full line."""
+        if translated_body and translated_body != request.text:
+            self.cache.set(request.text, request.cache_key_extra, translated_body)
+            self.cache.log(request.original_text, translated_body, request.style)
+
+    def _translate_segments(self, request, priority):
+        """
+        Translates text sentence by sentence, reusing cached segments and sending
+        only the missing ones to OpenAI in a single batched request.
+        Returns None when segmenting doesn't apply or the batch fails.
+        """
+        segments = split_segments(request.text)
+        cores = []
+        for _, core, _ in segments:
+            if is_translatable(core) and core not in cores:
+                cores.append(core)
+        if len(cores) < 2:
+            return None
+
+        translations = {}
+        missing = []
+        for core in cores:
+            cached = self.cache.get(core, request.cache_key_extra)
+            if cached:
+                translations[core] = cached
+            else:
+                missing.append(core)
+
+        if self.verbose:
+            print(f"Segments: {len(cores)} total, {len(cores) - len(missing)} cached, {len(missing)} to translate.")
+
+        if missing:
+            results = self.openai.translate_batch(missing, request.prompt, route=request.route,
+                                                  priority=priority)
+            if results is None:
+                return None
+            for core, translated in zip(missing, results):
+                if translated is None:
+                    continue
+                translations[core] = translated
+                if translated != core:
+                    self.cache.set(core, request.cache_key_extra, translated)
+            if len(translations) < len(cores):
+                return None
+
+        return join_segments(segments, translations)
+
+    def _translate_uncached(self, request, priority=None):
+        """Translate via OpenAI (segment-wise if enabled) and store the result."""
+        priority = request.priority if priority is None else priority
+        translated_body = None
+        if self.segment_mode:
+            translated_body = self._translate_segments(request, priority)
+
+        if translated_body is None:
+            translated_body = self.openai.translate_text(request.text, request.prompt, route=request.route,
+                                                         priority=priority)
+
+        self.store(request, translated_body)
+        return translated_body
+
+    def translate_uncached(self, request):
+        """API translation of the request body, shared with identical in-flight requests."""
+        from src.request_scheduler import Urgency
+
+        # A hotkey press that joins a background prefetch of the same text
+        # promotes it to interactive (queue position and deadline) rather than
+        # waiting behind it or sending the same request again
+        urgency = Urgency(request.priority)
+        return self.inflight.do(
+            request.key, lambda: self._translate_uncached(request, urgency), urgency,
+            lambda leader: self.openai.scheduler.promote(leader, request.priority)
+        )
+
+    def translate_many(self, requests):
+        """
+        Translates several requests, packing the cache misses that share a prompt
+        and route into batched API calls. Returns [(translated_body, source)]
+        aligned with requests, like translate().
+        """
+        results = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            cached, hit_kind = self.lookup(request)
+            if cached:
+                results[i] = (cached, hit_kind)
+            else:
+                groups.setdefault((request.cache_key_extra, request.route.name), []).append(i)
+
+        for indices in groups.values():
+            first = requests[indices[0]]
+            texts = list(dict.fromkeys(requests[i].text for i in indices))
+            translated = self.openai.translate_batch(
+                texts, first.prompt, route=first.route, priority=first.priority
+            ) or [None] * len(texts)
+            by_text = dict(zip(texts, translated))
+            for i in indices:
+                request = requests[i]
+                body = by_text.get(request.text)
+                if body is None:
+                    # Hard fallback, as with single requests
+                    results[i] = (request.text, "api")
+                    continue
+                self.store(request, body)
+                results[i] = (body, "api")
+        return results
+
+    def translate(self, request):
+        """
+        Cache first, then OpenAI. Returns (translated_body, source) where source
+        is the cache hit kind or "api"; the body is the original text on failure.
+        """
+        cached, hit_kind = self.lookup(request)
+        if cached:
+            return cached, hit_kind
+        return self.translate_uncached(request), "api"
@@ -1,32 +1,48 @@
 
+import re
 import time
 import threading
 from evdev import UInput, ecodes as e
+from src.key_typer import KeyTyper
+from src.translation_pipeline import TranslationPipeline
+from src.metrics import metrics
+
+# End of a sentence (plus closing quotes/brackets and the following space) in streamed output
+CHUNK_BOUNDARY = re.compile(r"[.!?][\"')\]]*\s+")
 
 class TranslatorCore:
-    def __init__(self, config, cache, clipboard, openai_client):
+    def __init__(self, config, cache, clipboard, openai_client=None):
         self.config = config
         self.cache = cache
         self.clipboard = clipboard
         self.openai = openai_client
         self.uinput = None
-        self.style = config.get("style", "strict")
-        
-        # Determine prompt file path
-        self.prompt_path = config.get("prompt_file", "prompt.txt")
-        self.prompt_template = self._load_prompt()
+        # Parsing, cache and API translation, free of clipboard/key I/O
+        self.pipeline = TranslationPipeline(config, cache, openai_client)
+
+        # Clipboard and UInput are shared by every worker: copy and paste run one at a time
+        self.io_lock = threading.Lock()
+        # Keys translated ahead of time by the prefetch watcher, to attribute later hits
+        self._prefetched = set()
+        self._prefetch_lock = threading.Lock()
+        self.stats = {"prefetched": 0, "prefetch_hits": 0}
+        # How long simulated keys stay pressed (seconds)
+        self.key_hold = float(config.get("clipboard", {}).get("key_hold", 0.02))
 
         try:
             self.uinput = UInput()
         except Exception as ex:
             print(f"Warning: Could not create UInput device ({ex}). Key injection (Ctrl+C/V) will fail unless running as root/input group.")
 
-    def _load_prompt(self):
-        try:
-            with open(self.prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception:
-            return "Translate the following text to English (Style: {style}):"
+        # Output: "paste" (whole result), or stream it in as "type" / "chunked" pastes
+        output = config.get("output", {})
+        self.output_mode = str(output.get("mode", "paste")).lower()
+        self.typer = KeyTyper(self.uinput, float(output.get("type_delay", 0.002))) if self.uinput else None
+
+    def set_openai(self, openai_client):
+        """Attaches the OpenAI client when it is built after the core (deferred start-up)."""
+        self.openai = openai_client
+        self.pipeline.openai = openai_client
 
     def _sim_key_combo(self, modifier, key):
         """Simulates a key combination (e.g. Ctrl+C)."""
@@ -45,7 +61,7 @@ class TranslatorCore:
             self.uinput.write(e.EV_KEY, e.KEY_V, 1)
             
         self.uinput.syn()
-        time.sleep(0.05)
+        time.sleep(self.key_hold)
         
         # Release Key
         if key == "c":
@@ -59,16 +75,127 @@ class TranslatorCore:
             
         self.uinput.syn()
 
-    def process_selection(self):
-        """Main workflow: Copy -> Parse -> Translate -> Paste"""
+    def prefetch(self, original_text):
+        """
+        Translates text into the cache ahead of a hotkey press (no clipboard/key I/O).
+        Returns True if an API translation was made.
+        """
+        request = self.pipeline.prepare(original_text, priority="background")
+        if request is None:
+            return False
+        # The prefetched text usually stays on the clipboard, so the press that
+        # follows finds it unchanged: that must still count as a copy
+        self.clipboard.remember(original_text)
+
+        if self.pipeline.lookup(request, record=False)[0]:
+            return False
+
+        translated_body = self.pipeline.translate_uncached(request)
+        if translated_body == request.text:
+            return False
+
+        with self._prefetch_lock:
+            self._prefetched.add(request.key)
+            self.stats["prefetched"] += 1
+        return True
+
+    def _paste(self, text):
+        """Puts text on the clipboard and pastes it (caller holds io_lock)."""
+        handle = self.clipboard.set_text(text, serve_once=self.clipboard.confirm_paste)
+        # Ctrl+V before our write owns the clipboard would paste the old content
+        self.clipboard.wait_until_set(text, handle)
+        self._sim_key_combo("ctrl", "v")
+        self.clipboard.wait_for_paste(handle)
+
+    def _ready_output(self, pending):
+        """The part of the streamed-but-unsent text that can be output now."""
+        if self.output_mode == "chunked":
+            boundary = None
+            for boundary in CHUNK_BOUNDARY.finditer(pending):
+                pass
+            return pending[:boundary.end()] if boundary else ""
+        # Hold back trailing whitespace so the final output isn't padded
+        return pending[:len(pending.rstrip())]
+
+    def _stream_output(self, request, started, timings):
+        """
+        Streams the translation into the focused window as it arrives: "type" types
+        it through UInput, "chunked" pastes it sentence by sentence. If the stream
+        fails part-way, the partial output is erased and the original is pasted.
+        """
+        phase = time.perf_counter()
+        body = ""
+        # The command token goes out together with the first translated text
+        pending = f"{request.command_token} " if request.command_token else ""
+        emitted = 0
+
+        def emit(text):
+            nonlocal emitted
+            if "first_char" not in timings:
+                timings["first_char"] = time.perf_counter() - started
+            if self.output_mode == "type" and KeyTyper.can_type(text):
+                self.typer.type_text(text)
+            else:
+                self._paste(text)
+            emitted += len(text)
+
+        with self.io_lock:
+            try:
+                for delta in self.openai.translate_stream(request.text, request.prompt, route=request.route,
+                                                             priority=request.priority):
+                    if not body:
+                        delta = delta.lstrip()
+                    body += delta
+                    pending += delta
+                    if body:
+                        ready = self._ready_output(pending)
+                        if ready:
+                            emit(ready)
+                            pending = pending[len(ready):]
+
+                body = body.strip()
+                if not body:
+                    raise RuntimeError("empty completion")
+                if pending.strip():
+                    emit(pending.rstrip())
+            except Exception as ex:
+                # Hard fallback still holds: undo what was typed and paste the original
+                print(f"Streaming translation failed after {emitted} chars: {ex}")
+                if emitted:
+                    self.typer.backspace(emitted)
+                self._paste(request.original_text)
+                body = None
+
+        timings["translate"] = time.perf_counter() - phase
+        self.pipeline.store(request, body)
+
+        timings["total"] = time.perf_counter() - started
+        self._record(timings, "stream")
+        print("Done (streamed). " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+
+    @staticmethod
+    def _record(timings, label):
+        """Feeds one press's phase timings into the per-stage metrics."""
+        for name, seconds in timings.items():
+            metrics.observe(f"press.{name}", seconds, label)
+
+    def process_selection(self, style=None):
+        """Main workflow: Copy -> Parse -> Translate -> Paste (style: override for this press)"""
         print("Processing selection...")
+        started = time.perf_counter()
+        timings = {}
         
-        # 1. Simulate Copy (Ctrl+C)
-        self._sim_key_combo("ctrl", "c")
-        time.sleep(0.1) 
-        
-        # 2. Get Text
-        original_text = self.clipboard.get_text()
+        with self.io_lock:
+            phase = time.perf_counter()
+            # 1. Simulate Copy (Ctrl+C), fingerprinting the clipboard first
+            # so we can tell when the copied text has actually landed
+            before = self.clipboard.mark()
+            self._sim_key_combo("ctrl", "c")
+
+            # 2. Get Text
+            original_text = self.clipboard.wait_for_copy(before)
+            timings["copy"] = time.perf_counter() - phase
+
         if not original_text:
             print("No text in clipboard.")
             return
@@ -76,100 +203,49 @@ class TranslatorCore:
         print(f"Original: {original_text[:50]}...")
         
         # === STAGE 1: COMMAND PARSING ===
-        command_token = ""
-        translatable_text = original_text
-        mode_context = "DIALOGUE" # Default mode
-
-        # Check if first token is a command (starts with / followed by letters)
-        # e.g. /me, /do, /low, /Radio
-        first_space = original_text.find(" ")
-        if first_space != -1:
-            potential_cmd = original_text[:first_space]
-            if potential_cmd.startswith("/") and len(potential_cmd) > 1 and potential_cmd[1].isalpha():
-                command_token = potential_cmd
-                translatable_text = original_text[first_space+1:].strip()
-                
-                # Determine Context for AI (Strictly Rules)
-                slash_cmd = command_token.lower()
-                if slash_cmd in ["/me", "/lme"]:
-                    mode_context = "ACTION (User is performing an action. Use 3rd person present tense, e.g. 'runs', 'points')."
-                elif slash_cmd in ["/do", "/ldo"]:
-                    mode_context = "DESCRIPTION (User is describing the environment/state. Use descriptive/passive English)."
-                else:
-                    mode_context = f"DIALOGUE (User is speaking with command {command_token})."
-        
-        if not translatable_text:
+        request = self.pipeline.prepare(original_text, style=style)
+        if request is None:
             # Nothing to translate
             return
 
+        phase = time.perf_counter()
+
         # === STAGE 2: TRANSLATION ===
         # We perform translation on the stripped text ONLY.
         # But we inject the 'mode_context' into the style to guide neutral grammar.
-        
-        # 3. Check Cache (Cache key must include mode to be unique but NOT the command token itself if we want reusability, 
-        # actually command token matters for mode. Let's cache based on (translatable_text, style, mode_context))
-        cache_key_extra = f"{self.style}::{mode_context}"
-        
-        cached = self.cache.get(translatable_text, cache_key_extra)
+
+        # 3. Check Cache
+        cached, hit_kind = self.pipeline.lookup(request)
         if cached:
-            print("Cache hit!")
+            print(f"Cache hit ({hit_kind})!")
             translated_body = cached
+            with self._prefetch_lock:
+                if request.key in self._prefetched:
+                    self._prefetched.discard(request.key)
+                    self.stats["prefetch_hits"] += 1
+                    print("Served by prefetch.")
+        elif self.output_mode in ("type", "chunked") and self.typer:
+            # 4. Stream from OpenAI straight into the focused window
+            self._stream_output(request, started, timings)
+            return
         else:
             # 4. Translate via OpenAI
-            # Determine Style override for RP commands
-            # RP commands must ALWAYS be strict, covering the user's requirement.
-            effective_style = self.style
-            if slash_cmd in ["/me", "/lme", "/do", "/ldo"]:
-                effective_style = "strict"
-
-            # Inject context into the style variable passed to prompt template
-            # This ensures the AI sees the rule without seeing the token
-            augmented_style = f"{effective_style}\n[SYSTEM CONTEXT]: {mode_context}"
-            
-            # Update cache key to include the EFFECTIVE style, not just the global style
-            # This ensures strict RP translations are cached separately or correctly
-            cache_key_extra = f"{effective_style}::{mode_context}"
-            
-            # Check cache again with specific key if needed, or just rely on the flow
-            # (Simplification: We checked cache above with self.style. If we switch to strict, we should check cache with strict.)
-            # Let's do a quick re-check for cache if style changed
-            if effective_style != self.style:
-                 cached_strict = self.cache.get(translatable_text, cache_key_extra)
-                 if cached_strict:
-                     print("Cache hit (Strict RP)!")
-                     translated_body = cached_strict
-                     # Skip API call
-                     final_text = f"{command_token} {translated_body}"
-                     self.clipboard.set_text(final_text)
-                     time.sleep(0.1)
-                     self._sim_key_combo("ctrl", "v")
-                     print("Done.")
-                     return
-
-            translated_body = self.openai.translate_text(
-                translatable_text, 
-                self.prompt_template, 
-                augmented_style
-            )
-            
-            # Cache the BODY (without command)
-            if translated_body != translatable_text:
-                self.cache.set(translatable_text, cache_key_extra, translated_body)
-                self.cache.log(original_text, translated_body, effective_style)
+            translated_body = self.pipeline.translate_uncached(request)
 
         # === FINAL OUTPUT ASSEMBLY ===
-        if command_token:
-            final_text = f"{command_token} {translated_body}"
-        else:
-            final_text = translated_body
+        final_text = request.assemble(translated_body)
 
-        # 5. Set Clipboard
-        self.clipboard.set_text(final_text)
-        time.sleep(0.1)
-        
-        # 6. Simulate Paste (Ctrl+V)
-        self._sim_key_combo("ctrl", "v")
-        print("Done.")
+        timings["translate"] = time.perf_counter() - phase
+
+        with self.io_lock:
+            phase = time.perf_counter()
+            # 5. Set Clipboard, then 6. Simulate Paste (Ctrl+V)
+            self._paste(final_text)
+            timings["paste"] = time.perf_counter() - phase
+
+        timings["total"] = time.perf_counter() - started
+        self._record(timings, hit_kind if cached else "api")
+        print("Done. " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
 
     def close(self):
         if self.uinput:
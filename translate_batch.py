@@ -0,0 +1,178 @@
+
+"""
+Translate a file of chat lines without the hotkey: a plain text file (one
+line per message, e.g. a SAMP chatlog) or JSONL (one object per line, text
+taken from --field). Slash commands, modes and styles work exactly as with F9,
+results land in the same cache, and uncached lines are packed several to a
+request. Output is JSONL, written as each group of lines finishes:
+
+    {"line": 12, "original": "/me berjalan", "translated": "/me walks", "source": "api"}
+
+Re-running with the same --output skips lines already in it, so an
+interrupted run picks up where it stopped. Lines that failed ("unchanged")
+are retried then, and their new row is appended: the last row for a line wins.
+
+    python translate_batch.py chatlog.txt -o chatlog.en.jsonl
+    python translate_batch.py requests.jsonl --field body -o out.jsonl --workers 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from src.config_loader import load_config
+from src.cache_layer import CacheLayer
+from src.openai_client import OpenAIClient
+from src.translation_pipeline import TranslationPipeline
+
+def read_inputs(path, fmt, field):
+    """Yields (line_index, text); line_index is the physical line number (from 0)."""
+    if fmt == "auto":
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "text"
+    with open(path, 'r', encoding='utf-8') as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if fmt == "jsonl":
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    print(f"Line {index}: invalid JSON ({e}), skipped.", file=sys.stderr)
+                    continue
+                text = item.get(field) if isinstance(item, dict) else item
+                if not isinstance(text, str) or not text.strip():
+                    continue
+                line = text.strip()
+            yield index, line
+
+def finished_lines(path):
+    """
+    Line indices already translated in an earlier (possibly interrupted)
+    output file. Failed lines don't count, so a re-run retries them.
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                index = row["line"]
+            except (ValueError, KeyError, TypeError):
+                # A half-written last line from an interrupted run
+                continue
+            # Rows are appended in order, so a later retry overrides an earlier failure
+            if row.get("source") == "unchanged":
+                done.discard(index)
+            else:
+                done.add(index)
+    return done
+
+def translate_group(pipeline, items):
+    """Translates [(line_index, text)], packing cache misses into batched requests."""
+    requests = [pipeline.prepare(text, priority="background") for _, text in items]
+    prepared = [request for request in requests if request is not None]
+    translated = iter(pipeline.translate_many(prepared))
+
+    results = []
+    for (index, text), request in zip(items, requests):
+        if request is None:
+            results.append({"line": index, "original": text, "translated": text, "source": "skipped"})
+            continue
+        translated_body, source = next(translated)
+        if source == "api" and translated_body == request.text:
+            source = "unchanged"
+        results.append({"line": index, "original": text,
+                        "translated": request.assemble(translated_body), "source": source})
+    return results
+
+def write_results(out, results, counts):
+    for result in results:
+        counts[result["source"]] = counts.get(result["source"], 0) + 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="text or JSONL file")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout, no resume)")
+    parser.add_argument("--format", choices=["auto", "text", "jsonl"], default="auto")
+    parser.add_argument("--field", default="text", help="JSONL field holding the text (default: text)")
+    parser.add_argument("--workers", type=int, help="concurrent requests (default: batch.workers)")
+    parser.add_argument("--lines-per-request", type=int,
+                        help="lines packed into one request (default: openai.batch_max_lines)")
+    parser.add_argument("--style", help="override the configured style")
+    parser.add_argument("--config", default="config.yml")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.style:
+        config["style"] = args.style
+    workers = max(1, args.workers or int(config.get("batch", {}).get("workers", 4)))
+    if args.lines_per_request:
+        config["openai"]["batch_max_lines"] = args.lines_per_request
+    group_size = max(1, int(config["openai"].get("batch_max_lines", 20)))
+
+    cache = CacheLayer(db_path=config["cache"]["db_path"], options=config["cache"])
+    openai = OpenAIClient(config)
+    # Each worker has at most one background request waiting at a time; more
+    # workers than the scheduler's queue would fail lines with SchedulerBusy
+    capacity = max(1, openai.scheduler.max_background_queue)
+    if workers > capacity:
+        print(f"Using {capacity} workers (scheduler.max_background_queue).", file=sys.stderr)
+        workers = capacity
+    pipeline = TranslationPipeline(config, cache, openai)
+    pipeline.verbose = False
+
+    done = finished_lines(args.output)
+    if done:
+        print(f"Resuming: {len(done)} lines already translated.", file=sys.stderr)
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    if out is not sys.stdout and out.tell() > 0:
+        # Start on a fresh line after a half-written one
+        with open(args.output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")
+
+    counts = {}
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            group = []
+            for item in read_inputs(args.input, args.format, args.field):
+                if item[0] in done:
+                    continue
+                group.append(item)
+                if len(group) < group_size:
+                    continue
+                # Keep only a bounded window in flight so huge inputs aren't read up front
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write_results(out, future.result(), counts)
+                pending.add(executor.submit(translate_group, pipeline, group))
+                group = []
+            if group:
+                pending.add(executor.submit(translate_group, pipeline, group))
+            for future in pending:
+                write_results(out, future.result(), counts)
+    except KeyboardInterrupt:
+        print("\nInterrupted; re-run with the same --output to resume.", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        print(f"Translated {total} lines in {elapsed:.1f} s ("
+              + ", ".join(f"{source}={count}" for source, count in sorted(counts.items())) + ")",
+              file=sys.stderr)
+        print(openai.report(), file=sys.stderr)
+        # Flushes the write-behind queue so every translation is cached
+        cache.close()
+
+if __name__ == "__main__":
+    main()